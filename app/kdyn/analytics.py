@@ -1,7 +1,17 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from dataclasses import dataclass, field, fields
+from typing import Any, List, Dict, Tuple, Optional, Iterable, Sequence
+import heapq
+import logging
+import math
 import statistics
+from array import array
+from itertools import islice
+from .bursts import BurstIndex, DEFAULT_THRESHOLD_MS, DEFAULT_THRESHOLDS, MIN_GAPS, tukey_threshold
+from .extractors import Extractor, ExtractorEngine, SeriesChunks, registered_extractors
+from .robust import LogHistogram, RobustEstimator
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class HoldEvent:
@@ -26,6 +36,21 @@ class Metrics:
     bursts: int
     avg_burst_len: float
     per_key: List[Dict]
+    profile_score: Optional[float] = None
+    rollovers: int = 0
+    filtered: Dict[str, int] = field(default_factory=dict)
+    burst_threshold_ms: float = DEFAULT_THRESHOLD_MS
+    burst_profile: List[Dict] = field(default_factory=list)
+    segments: List[Dict] = field(default_factory=list)
+    extras: Dict[str, Any] = field(default_factory=dict)
+    rejected: Dict[str, int] = field(default_factory=dict)
+    robust: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+def metrics_from_dict(data: Dict) -> Metrics:
+    """Inverse of the JSON report: unknown keys are ignored, missing optional ones defaulted."""
+    known = {f.name for f in fields(Metrics)}
+    return Metrics(**{k: v for k, v in data.items() if k in known})
 
 
 def _percentile(data: List[float], p: float) -> float:
@@ -42,61 +67,282 @@ def _percentile(data: List[float], p: float) -> float:
     return float(d0 + d1)
 
 
-def compute_bursts(timestamps_ms: List[float], threshold_ms: float = 700.0) -> Tuple[int, float]:
+def _merged_median(runs: Sequence[Sequence[float]], n: int) -> float:
+    """Median of the union of sorted runs (n values in total) without materializing it."""
+    if not n:
+        return 0.0
+    it = islice(heapq.merge(*runs), (n - 1) // 2, None)
+    mid = next(it)
+    return float(mid if n % 2 else (mid + next(it)) / 2)
+
+
+def compute_bursts(timestamps_ms: List[float], threshold_ms: float = DEFAULT_THRESHOLD_MS) -> Tuple[int, float]:
     """
     timestamps_ms: press timestamps (ms) sorted ascending.
     Returns: (burst_count, avg_burst_len)
+    For several thresholds, build one BurstIndex and query it instead.
+    """
+    idx = BurstIndex(timestamps_ms)
+    return idx.count(threshold_ms), idx.avg_len(threshold_ms)
+
+
+class HoldStatsExtractor(Extractor):
+    """Built-in: overall and per-key hold medians / p95s."""
+    name = "holds"
+    series = ("hold",)
+
+    def init(self):
+        return {}
+
+    def update(self, state, series, cols):
+        vks, ms = cols
+        for vk, v in zip(vks, ms):
+            a = state.get(vk)
+            if a is None:
+                a = state[vk] = array("d")
+            a.append(v)
+        return state
+
+    def merge(self, a, b):
+        for vk, v in b.items():
+            a.setdefault(vk, array("d")).extend(v)
+        return a
+
+    def finalize(self, state):
+        # Values are kept per key only; the overall median walks the sorted runs
+        per_key, runs = [], []
+        for code, v in sorted(state.items()):
+            v = array("d", sorted(v))
+            runs.append(v)
+            per_key.append({
+                "code": int(code),
+                "count": int(len(v)),
+                "median_hold": float(statistics.median(v)),
+                "p95_hold": float(_percentile(v, 0.95)),
+            })
+        count = sum(len(v) for v in runs)
+        return {
+            "count": count,
+            "median": _merged_median(runs, count),
+            "per_key": per_key,
+        }
+
+
+class LatencyStatsExtractor(Extractor):
+    """Built-in: latency median / p95."""
+    name = "latencies"
+    series = ("latency",)
+
+    def init(self):
+        return array("d")
+
+    def update(self, state, series, cols):
+        state.extend(cols[0])
+        return state
+
+    def merge(self, a, b):
+        a.extend(b)
+        return a
+
+    def finalize(self, state):
+        vals = sorted(state)
+        return {
+            "count": len(vals),
+            "median": float(statistics.median(vals)) if vals else 0.0,
+            "p95": float(_percentile(vals, 0.95)) if vals else 0.0,
+        }
+
+
+class BurstExtractor(Extractor):
+    """Built-in: burst count/length at the chosen (fixed or adaptive) threshold plus the threshold profile."""
+    name = "bursts"
+    series = ("press",)
+
+    def __init__(self, mode: str = "fixed", threshold_ms: float = DEFAULT_THRESHOLD_MS,
+                 thresholds: Sequence[float] = DEFAULT_THRESHOLDS):
+        self.mode = mode
+        self.threshold_ms = threshold_ms
+        self.thresholds = thresholds
+
+    def init(self):
+        return array("d")
+
+    def update(self, state, series, cols):
+        state.extend(cols[1])
+        return state
+
+    def merge(self, a, b):
+        a.extend(b)
+        return a
+
+    def finalize(self, state):
+        # One pass over inter-press gaps serves the chosen threshold and the whole profile
+        idx = BurstIndex(state)
+        thr = idx.adaptive_threshold(default_ms=self.threshold_ms) if self.mode == "adaptive" else self.threshold_ms
+        return {"threshold_ms": float(thr), "bursts": idx.count(thr), "avg_len": float(idx.avg_len(thr)),
+                "profile": idx.profile(self.thresholds)}
+
+
+class LiveBurstExtractor(Extractor):
+    """
+    Bounded-state burst KPIs for the live view: inter-press gaps go into a
+    LogHistogram, so the (fixed or adaptive) threshold and the burst count are
+    histogram approximations whatever the session length. `mode` and
+    `threshold_ms` apply at finalize time and may change between reads.
     """
-    if not timestamps_ms:
-        return 0, 0.0
-    bursts = []
-    current_len = 1
-    for i in range(1, len(timestamps_ms)):
-        if timestamps_ms[i] - timestamps_ms[i - 1] < threshold_ms:
-            current_len += 1
-        else:
-            bursts.append(current_len)
-            current_len = 1
-    bursts.append(current_len)
-    return len(bursts), (sum(bursts) / len(bursts)) if bursts else 0.0
+    name = "bursts"
+    series = ("press",)
+
+    def __init__(self, mode: str = "fixed", threshold_ms: float = DEFAULT_THRESHOLD_MS):
+        self.mode = mode
+        self.threshold_ms = threshold_ms
+
+    def init(self):
+        # [presses, first_ts, last_ts, positive gaps]
+        return [0, None, None, LogHistogram()]
+
+    def update(self, state, series, cols):
+        last, gaps = state[2], state[3]
+        for t in cols[1]:
+            if last is None:
+                state[1] = t
+            elif t > last:
+                gaps.add(t - last)
+            last = t
+        state[0] += len(cols[1])
+        state[2] = last
+        return state
+
+    def merge(self, a, b):
+        if b[0] == 0:
+            return a
+        if a[0] == 0:
+            return b
+        if b[1] > a[2]:
+            a[3].add(b[1] - a[2])
+        a[3].merge(b[3])
+        a[0] += b[0]
+        a[2] = b[2]
+        return a
+
+    def finalize(self, state):
+        presses, gaps = state[0], state[3]
+        thr = self.threshold_ms
+        if self.mode == "adaptive" and gaps.count >= MIN_GAPS:
+            thr = tukey_threshold(math.log(gaps.quantile(0.25)), math.log(gaps.quantile(0.75)))
+        bursts = gaps.count_at_least(thr) + 1 if presses else 0
+        return {"threshold_ms": float(thr), "bursts": bursts, "avg_len": presses / bursts if bursts else 0.0}
+
+
+class RobustStatsExtractor(Extractor):
+    """Built-in: median, MAD, IQR, trimmed and winsorized means of holds and latencies, in constant memory."""
+    name = "robust"
+    series = ("hold", "latency")
+
+    def init(self):
+        return {"hold": LogHistogram(), "latency": LogHistogram()}
+
+    def update(self, state, series, cols):
+        add = state[series].add
+        for v in cols[-1]:
+            add(v)
+        return state
+
+    def merge(self, a, b):
+        for k in a:
+            a[k].merge(b[k])
+        return a
+
+    def finalize(self, state):
+        return {k: RobustEstimator(h).summary() for k, h in state.items()}
 
 
 def aggregate(session_id: str, started_at: str, duration_secs: int,
-              total_events: int, holds: List[HoldEvent], latencies: List[LatencyEvent],
-              press_timestamps_ms: List[float]) -> Metrics:
-    hold_vals = [h.hold_ms for h in holds]
+              total_events: int, holds: Iterable[HoldEvent], latencies: Iterable[LatencyEvent],
+              press_timestamps_ms: Iterable[float], profile_score: Optional[float] = None,
+              rollovers: int = 0, filtered: Optional[Dict[str, int]] = None,
+              burst_mode: str = "fixed", burst_threshold_ms: float = DEFAULT_THRESHOLD_MS,
+              burst_thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+              segments: Optional[List[Dict]] = None,
+              rejected: Optional[Dict[str, int]] = None,
+              extractors: Optional[Sequence[Extractor]] = None,
+              press_codes: Optional[Iterable[int]] = None) -> Metrics:
+    """
+    Metrics from event objects (see aggregate_columns). Inputs may be one-shot
+    iterators (e.g. streamed back from a spilled EventStore). Without `press_codes`
+    there is no press vk column, so custom extractors reading the press series are
+    skipped rather than fed placeholder codes.
+    """
+    hold_vk: List[int] = []
+    hold_ms: List[float] = []
+    for h in holds:
+        hold_vk.append(h.code)
+        hold_ms.append(h.hold_ms)
     lat_vals = [l.latency_ms for l in latencies]
+    stamps = list(press_timestamps_ms)
+    custom = registered_extractors() if extractors is None else list(extractors)
+    if press_codes is None:
+        codes: List[int] = [0] * len(stamps)  # read only by BurstExtractor, which ignores them
+        skipped = [e.name for e in custom if "press" in e.series]
+        if skipped:
+            logger.warning("No press codes given; skipping extractors %s", skipped)
+            custom = [e for e in custom if "press" not in e.series]
+    else:
+        codes = list(press_codes)
+        if len(codes) != len(stamps):
+            raise ValueError(f"press_codes ({len(codes)}) and press_timestamps_ms ({len(stamps)}) differ in length")
+    data = {
+        "press": [(codes, stamps)],
+        "hold": [(hold_vk, hold_ms)],
+        "latency": [(lat_vals,)],
+    }
+    return aggregate_columns(session_id, started_at, duration_secs, total_events, data,
+                             profile_score=profile_score, rollovers=rollovers, filtered=filtered,
+                             burst_mode=burst_mode, burst_threshold_ms=burst_threshold_ms,
+                             burst_thresholds=burst_thresholds, segments=segments, rejected=rejected,
+                             extractors=custom)
 
-    median_hold = statistics.median(hold_vals) if hold_vals else 0.0
-    median_latency = statistics.median(lat_vals) if lat_vals else 0.0
-    p95_latency = _percentile(lat_vals, 0.95) if lat_vals else 0.0
 
-    # Per-key stats
-    per_key_map: Dict[int, List[float]] = {}
-    for h in holds:
-        per_key_map.setdefault(h.code, []).append(h.hold_ms)
-    per_key = []
-    for code, vals in sorted(per_key_map.items()):
-        per_key.append({
-            "code": int(code),
-            "count": int(len(vals)),
-            "median_hold": float(statistics.median(vals)),
-            "p95_hold": float(_percentile(vals, 0.95)),
-        })
-
-    bursts_count, avg_burst_len = compute_bursts(press_timestamps_ms)
+def aggregate_columns(session_id: str, started_at: str, duration_secs: int, total_events: int,
+                      data: SeriesChunks, profile_score: Optional[float] = None,
+                      rollovers: int = 0, filtered: Optional[Dict[str, int]] = None,
+                      burst_mode: str = "fixed", burst_threshold_ms: float = DEFAULT_THRESHOLD_MS,
+                      burst_thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+                      segments: Optional[List[Dict]] = None,
+                      rejected: Optional[Dict[str, int]] = None,
+                      extractors: Optional[Sequence[Extractor]] = None) -> Metrics:
+    """
+    Metrics from chunked event columns (see extractors.SERIES) in one fused pass.
+    Registered custom extractors (or `extractors`, if given) run in the same pass
+    and land in Metrics.extras under their names.
+    """
+    custom = registered_extractors() if extractors is None else list(extractors)
+    engine = ExtractorEngine([HoldStatsExtractor(), LatencyStatsExtractor(),
+                              BurstExtractor(burst_mode, burst_threshold_ms, burst_thresholds),
+                              RobustStatsExtractor()] + custom)
+    r = engine.run(data)
+    holds, lats, bursts = r["holds"], r["latencies"], r["bursts"]
 
     return Metrics(
         session_id=session_id,
         started_at=started_at,
         duration_secs=int(duration_secs),
         events=int(total_events),
-        holds_count=int(len(holds)),
-        latency_count=int(len(latencies)),
-        median_hold_ms=float(median_hold),
-        median_latency_ms=float(median_latency),
-        p95_latency_ms=float(p95_latency),
-        bursts=int(bursts_count),
-        avg_burst_len=float(avg_burst_len),
-        per_key=per_key,
-    )
\ No newline at end of file
+        holds_count=int(holds["count"]),
+        latency_count=int(lats["count"]),
+        median_hold_ms=float(holds["median"]),
+        median_latency_ms=float(lats["median"]),
+        p95_latency_ms=float(lats["p95"]),
+        bursts=int(bursts["bursts"]),
+        avg_burst_len=float(bursts["avg_len"]),
+        per_key=holds["per_key"],
+        profile_score=None if profile_score is None else float(profile_score),
+        rollovers=int(rollovers),
+        filtered={str(k): int(v) for k, v in (filtered or {}).items()},
+        burst_threshold_ms=float(bursts["threshold_ms"]),
+        burst_profile=bursts["profile"],
+        segments=list(segments or []),
+        extras={e.name: r[e.name] for e in custom},
+        rejected={str(k): int(v) for k, v in (rejected or {}).items()},
+        robust=r["robust"],
+    )
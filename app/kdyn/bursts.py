@@ -0,0 +1,113 @@
+from __future__ import annotations
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Sequence
+
+DEFAULT_THRESHOLD_MS = 700.0
+DEFAULT_THRESHOLDS: Sequence[float] = (250.0, 500.0, 700.0, 1000.0, 1500.0, 2000.0)
+
+# Adaptive thresholds are clamped to this range; below MIN_GAPS the default is used.
+ADAPTIVE_RANGE_MS = (150.0, 3000.0)
+MIN_GAPS = 10
+
+
+def _quantile(sorted_vals: Sequence[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p
+    f = int(k)
+    c = min(f + 1, len(sorted_vals) - 1)
+    return float(sorted_vals[f] + (sorted_vals[c] - sorted_vals[f]) * (k - f))
+
+
+class BurstIndex:
+    """
+    Burst segmentation for any threshold from a single pass over press timestamps.
+
+    A burst continues while the gap to the previous press is below the threshold.
+    Gaps are collected once (in time order) and sorted once, so:
+      - burst count / average length for a threshold is a bisect, O(log n);
+      - the length distribution is one scan of the time-ordered gaps, O(n).
+    Memory is two float arrays of n - 1 gaps.
+    """
+
+    def __init__(self, timestamps_ms: Iterable[float]):
+        gaps = array("d")
+        prev = None
+        n = 0
+        for t in timestamps_ms:
+            if prev is not None:
+                gaps.append(t - prev)
+            prev = t
+            n += 1
+        self.presses = n
+        self._gaps = gaps
+        self._sorted = array("d", sorted(gaps))
+
+    @property
+    def gaps(self) -> Sequence[float]:
+        return self._sorted
+
+    def _breaks(self, threshold_ms: float) -> int:
+        return len(self._sorted) - bisect_left(self._sorted, threshold_ms)
+
+    def count(self, threshold_ms: float = DEFAULT_THRESHOLD_MS) -> int:
+        return self._breaks(threshold_ms) + 1 if self.presses else 0
+
+    def avg_len(self, threshold_ms: float = DEFAULT_THRESHOLD_MS) -> float:
+        c = self.count(threshold_ms)
+        return self.presses / c if c else 0.0
+
+    def lengths(self, threshold_ms: float = DEFAULT_THRESHOLD_MS) -> List[int]:
+        """Burst lengths (presses per burst) in time order."""
+        if not self.presses:
+            return []
+        # Gap i sits between press i and i+1, so a break at i ends a burst after press i
+        out = []
+        start = 0
+        for i, g in enumerate(self._gaps):
+            if g >= threshold_ms:
+                out.append(i + 1 - start)
+                start = i + 1
+        out.append(self.presses - start)
+        return out
+
+    def distribution(self, threshold_ms: float = DEFAULT_THRESHOLD_MS) -> Dict:
+        lens = sorted(self.lengths(threshold_ms))
+        return {
+            "threshold_ms": float(threshold_ms),
+            "bursts": len(lens),
+            "avg_len": float(sum(lens) / len(lens)) if lens else 0.0,
+            "median_len": _quantile(lens, 0.5),
+            "p95_len": _quantile(lens, 0.95),
+            "max_len": int(lens[-1]) if lens else 0,
+        }
+
+    def profile(self, thresholds: Iterable[float] = DEFAULT_THRESHOLDS) -> List[Dict]:
+        return [self.distribution(t) for t in thresholds]
+
+    def adaptive_threshold(self, default_ms: float = DEFAULT_THRESHOLD_MS) -> float:
+        """
+        Per-typist threshold from the gap distribution: within-burst gaps form the bulk,
+        pauses are the upper outliers, so use the Tukey upper fence of the log-gaps.
+        """
+        start = bisect_right(self._sorted, 0.0)  # positive gaps are the sorted suffix
+        m = len(self._sorted) - start
+        if m < MIN_GAPS:
+            return default_ms
+
+        def log_quantile(p: float) -> float:
+            # log is monotonic: interpolate between the logs of the bracketing order statistics
+            k = (m - 1) * p
+            f = int(k)
+            c = min(f + 1, m - 1)
+            lf, lc = math.log(self._sorted[start + f]), math.log(self._sorted[start + c])
+            return lf + (lc - lf) * (k - f)
+        return tukey_threshold(log_quantile(0.25), log_quantile(0.75))
+
+
+def tukey_threshold(q1_log: float, q3_log: float) -> float:
+    """Tukey upper fence of the log-gaps, clamped to ADAPTIVE_RANGE_MS."""
+    lo, hi = ADAPTIVE_RANGE_MS
+    return float(min(max(math.exp(q3_log + 1.5 * (q3_log - q1_log)), lo), hi))
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .extractors import SERIES
+from .store import EventStore, CHUNK_ITEMS
+
+try:  # Optional: Arrow IPC / Parquet output
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - depends on environment
+    pa = None
+
+HAVE_ARROW = pa is not None
+
+_ARROW_TYPE = {"d": "float64", "i": "int32"}
+
+# One line per row, fields in extractors.SERIES order
+_LINE = {
+    "press": '{"kind":"press","vk":%d,"ts_ms":%r}\n',
+    "hold": '{"kind":"hold","vk":%d,"hold_ms":%r}\n',
+    "latency": '{"kind":"latency","latency_ms":%r}\n',
+}
+
+
+def export_ndjson(store: EventStore, path: Path, session_id: str = "",
+                  chunk_events: int = CHUNK_ITEMS) -> Path:
+    """
+    Stream the timing-only event series as newline-delimited JSON.
+    The first line is a header; then one record per press, hold and latency.
+    Memory overhead is bounded by `chunk_events`, independent of session length.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One snapshot for the header counts and the body, even while recording
+    seg, epoch = store.snapshot()
+    header = {"kind": "session", "session_id": session_id,
+              "presses": seg.press_end, "holds": seg.hold_end, "latencies": seg.latency_end}
+    data = store.series_chunks(chunk_events, segment=seg, epoch=epoch)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(header) + "\n")
+        for series, line in _LINE.items():
+            for cols in data[series]:
+                f.write("".join(map(line.__mod__, zip(*cols))))
+    return path
+
+
+def _schema(store: EventStore, series: str) -> "pa.Schema":
+    return pa.schema([(name, getattr(pa, _ARROW_TYPE[c.typecode])())
+                      for name, c in zip(SERIES[series], store.series[series])])
+
+
+def _record_batch(schema: "pa.Schema", cols: Tuple) -> "pa.RecordBatch":
+    # Chunks are contiguous machine arrays, so Arrow wraps their buffers without per-value conversion
+    arrays = [pa.Array.from_buffers(field.type, len(c), [None, pa.py_buffer(c)]) for c, field in zip(cols, schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_arrow(store: EventStore, base_path: Path, fmt: str = "ipc",
+                 chunk_events: int = CHUNK_ITEMS) -> List[Path]:
+    """
+    Write one Arrow IPC (`.arrow`) or Parquet (`.parquet`) file per series,
+    `<base_path>.<series>.<ext>`, one record batch / row group per chunk.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if fmt not in ("ipc", "parquet"):
+        raise ValueError(f"Unknown Arrow format: {fmt}")
+    base_path = Path(base_path)
+    base_path.parent.mkdir(parents=True, exist_ok=True)
+    ext = "arrow" if fmt == "ipc" else "parquet"
+    out: List[Path] = []
+    seg, epoch = store.snapshot()
+    data = store.series_chunks(chunk_events, segment=seg, epoch=epoch)
+    for series in SERIES:
+        path = base_path.with_name(f"{base_path.name}.{series}.{ext}")
+        schema = _schema(store, series)
+        if fmt == "ipc":
+            writer = pa.ipc.new_file(str(path), schema)
+        else:
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(str(path), schema)
+        try:
+            for cols in data[series]:
+                batch = _record_batch(schema, cols)
+                if fmt == "ipc":
+                    writer.write_batch(batch)
+                else:
+                    writer.write_table(pa.Table.from_batches([batch]))
+        finally:
+            writer.close()
+        out.append(path)
+    return out
+
+
+def read_ndjson(path: Path, kind: Optional[str] = None) -> Iterator[Dict]:
+    """Stream records back (optionally only one kind); mainly for tooling and tests."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if kind is None or rec.get("kind") == kind:
+                yield rec
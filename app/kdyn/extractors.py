@@ -0,0 +1,146 @@
+from __future__ import annotations
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Event series and the columns each chunk carries, in order.
+SERIES: Dict[str, Tuple[str, ...]] = {
+    "press": ("vk", "ts_ms"),
+    "hold": ("vk", "hold_ms"),
+    "latency": ("latency_ms",),
+}
+
+Chunk = Tuple[Sequence, ...]
+SeriesChunks = Mapping[str, Iterable[Chunk]]
+
+
+class Extractor:
+    """
+    A metric computed by the fused engine.
+
+    init() -> state; update(state, series, cols) -> state for each chunk of a
+    series listed in `series` (cols follow SERIES[series]); merge(a, b) -> state
+    combines partial states of consecutive chunks (a before b); finalize(state)
+    returns a JSON-serializable result, stored under `name`.
+    """
+    name: str = ""
+    series: Tuple[str, ...] = ()
+
+    def init(self) -> Any:
+        return None
+
+    def update(self, state: Any, series: str, cols: Chunk) -> Any:
+        return state
+
+    def merge(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError(f"{type(self).__name__} does not support merging")
+
+    def finalize(self, state: Any) -> Any:
+        return state
+
+
+_REGISTRY: Dict[str, Callable[[], Extractor]] = {}
+# Names of the built-in extractors in analytics, which run alongside every custom one
+BUILTIN_NAMES = frozenset({"holds", "latencies", "bursts", "robust"})
+
+
+def register_extractor(factory: Callable[[], Extractor]) -> Callable[[], Extractor]:
+    """
+    Register a custom metric (class or zero-arg factory); usable as a decorator.
+    Custom metrics also run in `ExtractorEngine.run_parallel`, so they must
+    implement `merge`, and their name must not shadow a built-in one.
+    """
+    ext = factory()
+    if not ext.name:
+        raise ValueError("Extractor must define a name")
+    if ext.name in BUILTIN_NAMES:
+        raise ValueError(f"Extractor name {ext.name!r} is reserved for a built-in metric")
+    if type(ext).merge is Extractor.merge:
+        raise ValueError(f"{type(ext).__name__} must implement merge()")
+    _REGISTRY[ext.name] = factory
+    return factory
+
+
+def unregister_extractor(name: str) -> None:
+    _REGISTRY.pop(name, None)
+
+
+def registered_extractors() -> List[Extractor]:
+    return [f() for f in _REGISTRY.values()]
+
+
+class ExtractorEngine:
+    """
+    Runs extractors in one fused pass: each series is read once, chunk by chunk,
+    and every interested extractor updates on the chunk while it is hot. The
+    number of passes depends only on the series, not on how many extractors run.
+    """
+
+    def __init__(self, extractors: Sequence[Extractor]):
+        names = [e.name for e in extractors]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate extractor names: {names}")
+        self.extractors = list(extractors)
+        self._by_series: Dict[str, List[Extractor]] = {
+            s: [e for e in self.extractors if s in e.series] for s in SERIES}
+        self.passes = 0
+        self.states: Dict[str, Any] = self.init_states()
+
+    def init_states(self) -> Dict[str, Any]:
+        return {e.name: e.init() for e in self.extractors}
+
+    def _feed(self, states: Dict[str, Any], series: str, cols: Chunk) -> None:
+        for e in self._by_series[series]:
+            states[e.name] = e.update(states[e.name], series, cols)
+
+    def run_states(self, data: SeriesChunks) -> Dict[str, Any]:
+        """One pass per series present in `data`; returns unfinalized states."""
+        states = self.init_states()
+        for series, chunks in data.items():
+            if not self._by_series.get(series):
+                continue
+            self.passes += 1
+            for cols in chunks:
+                self._feed(states, series, cols)
+        return states
+
+    def merge_states(self, parts: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        out = parts[0]
+        for p in parts[1:]:
+            out = {e.name: e.merge(out[e.name], p[e.name]) for e in self.extractors}
+        return out
+
+    def finalize(self, states: Dict[str, Any]) -> Dict[str, Any]:
+        return {e.name: e.finalize(states[e.name]) for e in self.extractors}
+
+    def run(self, data: SeriesChunks) -> Dict[str, Any]:
+        return self.finalize(self.run_states(data))
+
+    def run_parallel(self, parts: Sequence[SeriesChunks], executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """
+        `parts` are consecutive slices of the session (e.g. segments or column ranges);
+        each is reduced independently, optionally on `executor`, then merged in order.
+        """
+        if not parts:
+            return self.finalize(self.init_states())
+        if executor is None:
+            states = [self.run_states(p) for p in parts]
+        else:
+            states = list(executor.map(self.run_states, parts))
+        return self.finalize(self.merge_states(states))
+
+    # Incremental mode: one event at a time into self.states
+
+    def push_press(self, vk: int, ts_ms: float) -> None:
+        self._feed(self.states, "press", ((vk,), (ts_ms,)))
+
+    def push_hold(self, vk: int, hold_ms: float) -> None:
+        self._feed(self.states, "hold", ((vk,), (hold_ms,)))
+
+    def push_latency(self, latency_ms: float) -> None:
+        self._feed(self.states, "latency", ((latency_ms,),))
+
+    def results(self) -> Dict[str, Any]:
+        return self.finalize(self.states)
+
+    def reset(self) -> None:
+        self.states = self.init_states()
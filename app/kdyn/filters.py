@@ -0,0 +1,176 @@
+from __future__ import annotations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+# Windows virtual-key codes for Shift/Ctrl/Alt (generic, left, right) and the Win keys.
+MODIFIER_VKS: FrozenSet[int] = frozenset({0x10, 0x11, 0x12, 0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0x5B, 0x5C})
+
+
+class EventFilter:
+    """
+    One stage of the pre-storage event pipeline.
+    on_press/on_release return False to drop the event; drops are counted per filter.
+    """
+    name = "filter"
+
+    def __init__(self):
+        self.dropped = 0
+
+    def on_press(self, vk: int, ts: float) -> bool:
+        return True
+
+    def on_release(self, vk: int, ts: float) -> bool:
+        return True
+
+    def clear_held(self) -> None:
+        """Forget keys currently held (releases are not seen while paused/stopped)."""
+
+    def forget(self, vk: int) -> None:
+        """Forget one held key whose release was missed."""
+
+    def reset(self) -> None:
+        self.dropped = 0
+        self.clear_held()
+
+    def stats(self) -> Dict[str, int]:
+        return {"dropped": self.dropped}
+
+
+class AutorepeatFilter(EventFilter):
+    """Collapses OS autorepeat: repeated presses of a key that is already down are dropped."""
+    name = "autorepeat"
+
+    def __init__(self):
+        super().__init__()
+        self._down: Set[int] = set()
+
+    def on_press(self, vk: int, ts: float) -> bool:
+        if vk in self._down:
+            self.dropped += 1
+            return False
+        self._down.add(vk)
+        return True
+
+    def on_release(self, vk: int, ts: float) -> bool:
+        self._down.discard(vk)
+        return True
+
+    def clear_held(self) -> None:
+        self._down.clear()
+
+    def forget(self, vk: int) -> None:
+        self._down.discard(vk)
+
+
+class ModifierFilter(EventFilter):
+    """Excludes modifier keys from timing stats."""
+    name = "modifiers"
+
+    def __init__(self, codes: Iterable[int] = MODIFIER_VKS):
+        super().__init__()
+        self.codes = frozenset(codes)
+
+    def on_press(self, vk: int, ts: float) -> bool:
+        if vk in self.codes:
+            self.dropped += 1
+            return False
+        return True
+
+    def on_release(self, vk: int, ts: float) -> bool:
+        return vk not in self.codes
+
+
+class RolloverTracker(EventFilter):
+    """Never drops; counts presses made while another key is still held (key rollover)."""
+    name = "rollover"
+
+    def __init__(self):
+        super().__init__()
+        self._down: Set[int] = set()
+        self.rollovers = 0
+        self.max_concurrent = 0
+
+    def on_press(self, vk: int, ts: float) -> bool:
+        if self._down:
+            self.rollovers += 1
+        self._down.add(vk)
+        if len(self._down) > self.max_concurrent:
+            self.max_concurrent = len(self._down)
+        return True
+
+    def on_release(self, vk: int, ts: float) -> bool:
+        self._down.discard(vk)
+        return True
+
+    def clear_held(self) -> None:
+        self._down.clear()
+
+    def forget(self, vk: int) -> None:
+        self._down.discard(vk)
+
+    def reset(self) -> None:
+        super().reset()
+        self.rollovers = 0
+        self.max_concurrent = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"dropped": self.dropped, "rollovers": self.rollovers, "max_concurrent": self.max_concurrent}
+
+
+class FilterChain:
+    """Runs filters in order; an event is stored only if every stage accepts it."""
+
+    def __init__(self, filters: Optional[List[EventFilter]] = None):
+        self.filters: List[EventFilter] = list(filters or [])
+
+    def on_press(self, vk: int, ts: float) -> bool:
+        for f in self.filters:
+            if not f.on_press(vk, ts):
+                return False
+        return True
+
+    def on_release(self, vk: int, ts: float) -> bool:
+        for f in self.filters:
+            if not f.on_release(vk, ts):
+                return False
+        return True
+
+    def clear_held(self) -> None:
+        for f in self.filters:
+            f.clear_held()
+
+    def forget(self, vk: int) -> None:
+        for f in self.filters:
+            f.forget(vk)
+
+    def reset(self) -> None:
+        for f in self.filters:
+            f.reset()
+
+    def get(self, name: str) -> Optional[EventFilter]:
+        for f in self.filters:
+            if f.name == name:
+                return f
+        return None
+
+    def drops(self) -> Dict[str, int]:
+        return {f.name: f.dropped for f in self.filters}
+
+    @property
+    def rollovers(self) -> int:
+        t = self.get(RolloverTracker.name)
+        return t.rollovers if isinstance(t, RolloverTracker) else 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {f.name: f.stats() for f in self.filters}
+
+
+def build_chain(collapse_autorepeat: bool = True, exclude_modifiers: bool = False,
+                track_rollover: bool = True) -> FilterChain:
+    filters: List[EventFilter] = []
+    if collapse_autorepeat:
+        filters.append(AutorepeatFilter())
+    if exclude_modifiers:
+        filters.append(ModifierFilter())
+    if track_rollover:
+        filters.append(RolloverTracker())
+    return FilterChain(filters)
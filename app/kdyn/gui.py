@@ -1,14 +1,22 @@
 from __future__ import annotations
 import uuid
 import datetime
-from typing import List
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from PySide6 import QtWidgets, QtCore, QtGui
 
-from .recorder import Recorder
-from .analytics import aggregate
-from .reports import write_json, write_html
+from .recorder import Recorder, RecorderState
+from .analytics import aggregate_columns
+from .reports import write_json, write_html, write_ndjson, write_arrow, REPORTS_DIR
+from .export import HAVE_ARROW
+from .history import SessionIndex, MetricsCache, Prefetcher, COLUMNS, INDEX_NAME
 from .settings import AppSettings, SessionDefaults, NotificationPrefs, UISettings
 from .notify import Notifier
+from .filters import build_chain
+from .robust import OutlierRejector, RejectionPolicy
+from .profile import ProfileBuilder, ProfileMatcher, load_profile, save_profile, PROFILE_PATH
 
 import logging
 logger = logging.getLogger(__name__)
@@ -45,6 +53,135 @@ class Sparkline(QtWidgets.QWidget):
         p.setPen(pen)
         p.drawPath(path)
 
+class HistoryModel(QtCore.QAbstractTableModel):
+    """
+    Virtualized table over the session index. Rows are fetched from SQLite one page
+    at a time as the view asks for them; full Metrics are parsed lazily into an LRU
+    cache, warmed in the background around the selected row.
+    """
+    PAGE = 256
+    MAX_PAGES = 16
+    metrics_loaded = QtCore.Signal(str)
+
+    def __init__(self, index: SessionIndex, parent=None):
+        super().__init__(parent)
+        self.session_index = index
+        self.cache = MetricsCache(index)
+        self.prefetcher = Prefetcher(self.cache, on_loaded=self.metrics_loaded.emit)
+        self._sort_column = "started_at"
+        self._descending = True
+        self._pages: "OrderedDict[int, List[Tuple]]" = OrderedDict()
+        self._count = index.count()
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return COLUMNS[section][1]
+        return None
+
+    def _row(self, row: int) -> Optional[Tuple]:
+        page = row // self.PAGE
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self.session_index.page(page * self.PAGE, self.PAGE, self._sort_column, self._descending)
+            self._pages[page] = rows
+            while len(self._pages) > self.MAX_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        i = row % self.PAGE
+        return rows[i] if i < len(rows) else None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.TextAlignmentRole and index.column() >= 2:
+            return int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        row = self._row(index.row())
+        if row is None:
+            return None
+        name, v = COLUMNS[index.column()][0], row[index.column()]
+        if v is None:
+            return "—"
+        if name == "profile_score":
+            return f"{v * 100:.0f}%"
+        if isinstance(v, float):
+            return f"{v:.1f}"
+        return str(v)
+
+    def sort(self, column: int, order=QtCore.Qt.AscendingOrder) -> None:
+        self.beginResetModel()
+        self._sort_column = COLUMNS[column][0]
+        self._descending = order == QtCore.Qt.DescendingOrder
+        self._pages.clear()
+        self.endResetModel()
+
+    def refresh(self) -> None:
+        self.beginResetModel()
+        self._pages.clear()
+        self._count = self.session_index.count()
+        self.endResetModel()
+
+    def session_id(self, row: int) -> Optional[str]:
+        r = self._row(row)
+        return r[0] if r else None
+
+    def prefetch_around(self, row: int, radius: int = 8) -> None:
+        lo, hi = max(row - radius, 0), min(row + radius + 1, self._count)
+        self.prefetcher.request([sid for sid in (self.session_id(i) for i in range(lo, hi)) if sid])
+
+
+class HistoryPane(QtWidgets.QWidget):
+    def __init__(self, index: SessionIndex, parent=None):
+        super().__init__(parent)
+        self.model = HistoryModel(index, self)
+        self.view = QtWidgets.QTableView()
+        self.view.setModel(self.model)
+        self.view.setSortingEnabled(True)
+        self.view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.view.verticalHeader().setDefaultSectionSize(22)
+        self.view.horizontalHeader().setSortIndicator(1, QtCore.Qt.DescendingOrder)
+        self.detail = QtWidgets.QLabel("Select a session to see details.")
+        self.detail.setWordWrap(True)
+        lay = QtWidgets.QVBoxLayout(self)
+        lay.addWidget(self.view, 1)
+        lay.addWidget(self.detail)
+        self.view.selectionModel().currentRowChanged.connect(self._on_row)
+        self.model.metrics_loaded.connect(self._on_loaded)
+        self.model.modelReset.connect(lambda: self.detail.setText("Select a session to see details."))
+        self._selected: Optional[str] = None
+
+    def _on_row(self, current: QtCore.QModelIndex, _previous=None):
+        self._selected = self.model.session_id(current.row()) if current.isValid() else None
+        if self._selected is None:
+            return
+        self.model.prefetch_around(current.row())
+        self._show(self._selected)
+
+    def _on_loaded(self, session_id: str):
+        if session_id == self._selected:
+            self._show(session_id)
+
+    def _show(self, session_id: str):
+        m = self.model.cache.peek(session_id)
+        if m is None:
+            self.detail.setText(f"<b>{session_id}</b> — loading…")
+            return
+        keys = ", ".join(f"{k['code']}×{k['count']}" for k in sorted(m.per_key, key=lambda k: -k['count'])[:8])
+        self.detail.setText(
+            f"<b>{m.session_id}</b> • {m.holds_count} holds • {m.latency_count} latencies • "
+            f"p95 latency {m.p95_latency_ms:.1f} ms • avg burst {m.avg_burst_len:.1f} • "
+            f"rollovers {m.rollovers}<br><span>Top keys (VK×count): {keys or '—'}</span>")
+
+
 class SettingsDialog(QtWidgets.QDialog):
     def __init__(self, settings: AppSettings, parent=None):
         super().__init__(parent)
@@ -56,11 +193,36 @@ class SettingsDialog(QtWidgets.QDialog):
         self.session_name = QtWidgets.QLineEdit(self.settings.session.session_name)
         self.max_duration = QtWidgets.QSpinBox(); self.max_duration.setRange(0, 86400); self.max_duration.setValue(self.settings.session.max_duration_sec)
         self.idle_timeout = QtWidgets.QSpinBox(); self.idle_timeout.setRange(0, 3600); self.idle_timeout.setValue(self.settings.session.idle_timeout_sec)
+        self.memory_budget = QtWidgets.QSpinBox(); self.memory_budget.setRange(1, 1024); self.memory_budget.setValue(self.settings.session.memory_budget_mb)
+        self.collapse_autorepeat = QtWidgets.QCheckBox("Collapse key autorepeat")
+        self.collapse_autorepeat.setChecked(self.settings.session.collapse_autorepeat)
+        self.exclude_modifiers = QtWidgets.QCheckBox("Exclude modifier keys")
+        self.exclude_modifiers.setChecked(self.settings.session.exclude_modifiers)
+        self.burst_mode = QtWidgets.QComboBox(); self.burst_mode.addItems(["fixed", "adaptive"])
+        self.burst_mode.setCurrentText(self.settings.session.burst_mode)
+        self.burst_threshold = QtWidgets.QSpinBox(); self.burst_threshold.setRange(50, 10000)
+        self.burst_threshold.setValue(int(self.settings.session.burst_threshold_ms))
+        self.outlier_method = QtWidgets.QComboBox(); self.outlier_method.addItems(["mad", "iqr", "none"])
+        self.outlier_method.setCurrentText(self.settings.session.outlier_method)
+        self.stale_press = QtWidgets.QSpinBox(); self.stale_press.setRange(1, 600)
+        self.stale_press.setValue(int(self.settings.session.stale_press_sec))
 
         # Theme
         self.theme = QtWidgets.QComboBox(); self.theme.addItems(["light","dark","high_contrast"])
         self.theme.setCurrentText(self.settings.ui.theme)
 
+        # Exports
+        self.export_ndjson = QtWidgets.QCheckBox("Export raw key order + timings (NDJSON)")
+        self.export_ndjson.setChecked(self.settings.export.timeseries_ndjson)
+        raw_warning = "Writes every key code in typing order; typed text can be reconstructed from it."
+        self.export_ndjson.setToolTip(raw_warning)
+        self.arrow_format = QtWidgets.QComboBox(); self.arrow_format.addItems(["none", "ipc", "parquet"])
+        self.arrow_format.setCurrentText(self.settings.export.arrow_format)
+        self.arrow_format.setEnabled(HAVE_ARROW)
+        self.arrow_format.setToolTip(raw_warning)
+        if not HAVE_ARROW:
+            self.arrow_format.setToolTip("Install pyarrow to enable Arrow/Parquet export")
+
         # Notifications
         self.use_discord = QtWidgets.QCheckBox("Enable Discord")
         self.use_discord.setChecked(self.settings.notifications.use_discord)
@@ -74,7 +236,16 @@ class SettingsDialog(QtWidgets.QDialog):
         layout.addRow("Session name", self.session_name)
         layout.addRow("Max duration (sec)", self.max_duration)
         layout.addRow("Idle timeout (sec)", self.idle_timeout)
+        layout.addRow("Event memory budget (MB)", self.memory_budget)
+        layout.addRow(self.collapse_autorepeat)
+        layout.addRow(self.exclude_modifiers)
+        layout.addRow("Burst threshold mode", self.burst_mode)
+        layout.addRow("Burst gap threshold (ms)", self.burst_threshold)
+        layout.addRow("Artifact rejection", self.outlier_method)
+        layout.addRow("Drop unreleased keys after (sec)", self.stale_press)
         layout.addRow("Theme", self.theme)
+        layout.addRow(self.export_ndjson)
+        layout.addRow("Raw key order export (Arrow)", self.arrow_format)
         layout.addRow(self.use_discord)
         layout.addRow("Discord webhook", self.discord_hook)
         layout.addRow(self.use_telegram)
@@ -90,7 +261,16 @@ class SettingsDialog(QtWidgets.QDialog):
         self.settings.session.session_name = self.session_name.text().strip() or "default"
         self.settings.session.max_duration_sec = int(self.max_duration.value())
         self.settings.session.idle_timeout_sec = int(self.idle_timeout.value())
+        self.settings.session.memory_budget_mb = int(self.memory_budget.value())
+        self.settings.session.collapse_autorepeat = self.collapse_autorepeat.isChecked()
+        self.settings.session.exclude_modifiers = self.exclude_modifiers.isChecked()
+        self.settings.session.burst_mode = self.burst_mode.currentText()
+        self.settings.session.burst_threshold_ms = float(self.burst_threshold.value())
+        self.settings.session.outlier_method = self.outlier_method.currentText()
+        self.settings.session.stale_press_sec = float(self.stale_press.value())
         self.settings.ui.theme = self.theme.currentText()
+        self.settings.export.timeseries_ndjson = self.export_ndjson.isChecked()
+        self.settings.export.arrow_format = self.arrow_format.currentText()
         self.settings.notifications.use_discord = self.use_discord.isChecked()
         self.settings.notifications.discord_webhook = self.discord_hook.text().strip()
         self.settings.notifications.use_telegram = self.use_telegram.isChecked()
@@ -109,6 +289,8 @@ class ConsentDialog(QtWidgets.QDialog):
             """
             <b>KDyn collects timing metadata only</b> (key down/up timestamps and derived metrics).
             <br>It does <b>not</b> capture plaintext characters, window titles, or field contents.
+            <br>Optional raw key-order exports (off by default, see Settings) list key codes in typing order,
+            from which typed text can be reconstructed.
             <br>By clicking <b>Accept</b>, you consent to timing-only collection for the current user session.
             """
         )
@@ -123,6 +305,9 @@ class ConsentDialog(QtWidgets.QDialog):
 
 class MainWindow(QtWidgets.QMainWindow):
     update_signal = QtCore.Signal()
+    history_synced = QtCore.Signal()
+    state_changed = QtCore.Signal(str)  # emitted from any recorder thread; delivered on the GUI thread
+    export_finished = QtCore.Signal(object)  # (metrics, paths) or the exception, from the export worker
 
     def __init__(self, settings: AppSettings):
         super().__init__()
@@ -131,7 +316,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setMinimumSize(900, 560)
 
         self.rec = Recorder(max_duration_sec=self.settings.session.max_duration_sec,
-                            idle_timeout_sec=self.settings.session.idle_timeout_sec)
+                            idle_timeout_sec=self.settings.session.idle_timeout_sec,
+                            filters=self._build_filters(),
+                            memory_budget_bytes=self.settings.session.memory_budget_mb * 1024 * 1024,
+                            rejection=self._rejection_policy())
+        self.rec.add_state_listener(lambda old, new: self.state_changed.emit(new.value))
 
         central = QtWidgets.QWidget(); self.setCentralWidget(central)
         root = QtWidgets.QVBoxLayout(central)
@@ -155,15 +344,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.lbl_med_lat = QtWidgets.QLabel("0.0")
         self.lbl_bursts = QtWidgets.QLabel("0")
         self.lbl_avg_burst = QtWidgets.QLabel("0.0")
+        self.lbl_profile = QtWidgets.QLabel("—")
         def big(lbl: QtWidgets.QLabel):
             f = lbl.font(); f.setPointSize(16); lbl.setFont(f)
-        for l in [self.lbl_events, self.lbl_med_hold, self.lbl_med_lat, self.lbl_bursts, self.lbl_avg_burst]:
+        for l in [self.lbl_events, self.lbl_med_hold, self.lbl_med_lat, self.lbl_bursts, self.lbl_avg_burst, self.lbl_profile]:
             big(l)
         kpi_grid.addWidget(QtWidgets.QLabel("Events"), 0,0); kpi_grid.addWidget(self.lbl_events, 1,0)
         kpi_grid.addWidget(QtWidgets.QLabel("Median Hold (ms)"), 0,1); kpi_grid.addWidget(self.lbl_med_hold, 1,1)
         kpi_grid.addWidget(QtWidgets.QLabel("Median Latency (ms)"), 0,2); kpi_grid.addWidget(self.lbl_med_lat, 1,2)
         kpi_grid.addWidget(QtWidgets.QLabel("Bursts"), 0,3); kpi_grid.addWidget(self.lbl_bursts, 1,3)
         kpi_grid.addWidget(QtWidgets.QLabel("Avg Burst Length"), 0,4); kpi_grid.addWidget(self.lbl_avg_burst, 1,4)
+        kpi_grid.addWidget(QtWidgets.QLabel("Profile Match"), 0,5); kpi_grid.addWidget(self.lbl_profile, 1,5)
 
         spark_card = QtWidgets.QGroupBox("Latency Sparkline (ms; recent)")
         sp_lay = QtWidgets.QVBoxLayout(spark_card)
@@ -174,16 +365,39 @@ class MainWindow(QtWidgets.QMainWindow):
         root.addLayout(kpi_grid)
         root.addWidget(spark_card)
 
+        # Session history (summaries come from the index; JSON is parsed only on demand)
+        self.history_index = SessionIndex(REPORTS_DIR / INDEX_NAME)
+        self.history = HistoryPane(self.history_index)
+        self.history_dock = QtWidgets.QDockWidget("History", self)
+        self.history_dock.setObjectName("history_dock")
+        self.history_dock.setWidget(self.history)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.history_dock)
+        self.history_synced.connect(self.history.model.refresh)
+        self.refresh_history()
+
         # Status bar + menu
         self.status = self.statusBar()
+        self.lbl_state = QtWidgets.QLabel()
+        self.status.addPermanentWidget(self.lbl_state)
         menu = self.menuBar()
         filem = menu.addMenu("&File")
         act_export = filem.addAction("Export Reports")
         act_export.triggered.connect(self.export_reports)
+        act_refresh_history = filem.addAction("Refresh History")
+        act_refresh_history.triggered.connect(self.refresh_history)
         filem.addSeparator()
         act_quit = filem.addAction("Exit")
         act_quit.triggered.connect(self.close)
 
+        profm = menu.addMenu("P&rofile")
+        act_enroll = profm.addAction("Enroll Current Session")
+        act_enroll.triggered.connect(self.enroll_profile)
+        act_clear_profile = profm.addAction("Clear Profile")
+        act_clear_profile.triggered.connect(self.clear_profile)
+
+        viewm = menu.addMenu("&View")
+        viewm.addAction(self.history_dock.toggleViewAction())
+
         prefm = menu.addMenu("&Preferences")
         act_settings = prefm.addAction("Settings…")
         act_settings.triggered.connect(self.open_settings)
@@ -205,6 +419,14 @@ class MainWindow(QtWidgets.QMainWindow):
         # State
         self.session_id: str | None = None
         self.lat_sample: List[float] = []
+        self.profile = load_profile()
+        if self.profile is not None:
+            self.rec.matcher = ProfileMatcher(self.profile)
+
+        self.state_changed.connect(self._on_state_changed)
+        self._on_state_changed(self.rec.state.value)
+        self._export_thread: threading.Thread | None = None
+        self.export_finished.connect(self._on_export_finished)
 
         # Apply theme
         self.apply_theme(self.settings.ui.theme)
@@ -239,21 +461,45 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.setStyleSheet("")
 
+    def _build_filters(self):
+        return build_chain(collapse_autorepeat=self.settings.session.collapse_autorepeat,
+                           exclude_modifiers=self.settings.session.exclude_modifiers)
+
+    def _rejection_policy(self):
+        return RejectionPolicy(method=self.settings.session.outlier_method,
+                               stale_press_sec=self.settings.session.stale_press_sec)
+
     # ACTIONS
     def start(self):
         if self.session_id is None:
             self.session_id = f"{self.session_name.text().strip() or 'session'}-{uuid.uuid4().hex[:8]}"
+            self.rec.filters = self._build_filters()
+            self.rec.rejector = OutlierRejector(self._rejection_policy())
         self.rec.max_duration_sec = self.settings.session.max_duration_sec
         self.rec.idle_timeout_sec = self.settings.session.idle_timeout_sec
+        self.rec.store.memory_budget_bytes = self.settings.session.memory_budget_mb * 1024 * 1024
+        self.rec.store.burst_threshold_ms = self.settings.session.burst_threshold_ms
         self.rec.start(datetime.datetime.utcnow().isoformat())
         self.status.showMessage("Recording started")
 
     def toggle_pause(self):
-        # Simplified: if paused, resume; else pause
-        # We infer state by checking if events progress; here we directly call both paths based on internal flag
-        self.rec.resume() if True else self.rec.pause()
-        # We can't easily query paused flag; give feedback generically
-        self.status.showMessage("Toggled pause/resume")
+        new = self.rec.toggle_pause()
+        if new is RecorderState.PAUSED:
+            self.status.showMessage("Paused")
+        elif new is RecorderState.RECORDING:
+            self.status.showMessage("Resumed")
+        else:
+            self.status.showMessage("Not recording")
+
+    def _on_state_changed(self, _value: str):
+        # Signals from concurrent transitions may arrive out of order; show the current state
+        state = self.rec.state
+        active = state in (RecorderState.RECORDING, RecorderState.PAUSED)
+        self.start_btn.setEnabled(not active)
+        self.pause_btn.setEnabled(active)
+        self.pause_btn.setText("Resume (Ctrl+P)" if state is RecorderState.PAUSED else "Pause (Ctrl+P)")
+        self.stop_btn.setEnabled(active)
+        self.lbl_state.setText(state.value.capitalize())
 
     def stop(self):
         self.rec.stop()
@@ -266,6 +512,22 @@ class MainWindow(QtWidgets.QMainWindow):
         self.refresh_kpis()
         self.status.showMessage("Reset")
 
+    def refresh_history(self):
+        # Picks up reports written outside the app; runs off the GUI thread
+        def work():
+            try:
+                self.history_index.sync(REPORTS_DIR)
+            except Exception as e:
+                logger.warning("History sync failed: %s", e)
+            self.history_synced.emit()
+        threading.Thread(target=work, name="KDynHistorySync", daemon=True).start()
+
+    def closeEvent(self, e: QtGui.QCloseEvent) -> None:
+        self.history.model.prefetcher.close()
+        self.rec.stop()
+        self.rec.store.close()  # removes spilled segment files
+        super().closeEvent(e)
+
     def about(self):
         QtWidgets.QMessageBox.information(self, "About KDyn",
             "KDyn records timing-only keystroke dynamics.\nNo plaintext is ever captured.")
@@ -276,55 +538,129 @@ class MainWindow(QtWidgets.QMainWindow):
             self.apply_theme(self.settings.ui.theme)
             self.status.showMessage("Settings saved.")
 
+    def enroll_profile(self):
+        store = self.rec.store
+        if not self.rec.started_at_iso or not len(store.hold_ms):
+            QtWidgets.QMessageBox.warning(self, "Nothing to enroll", "Record a session first.")
+            return
+        builder = ProfileBuilder.from_profile(self.profile) if self.profile else ProfileBuilder()
+        # Streamed chunk by chunk: a spilled session is never read back into RAM at once
+        builder.add_session(store.iter_holds(), store.press_vk, store.press_ts_ms)
+        self.profile = builder.build(self.settings.session.session_name)
+        save_profile(self.profile)
+        self.rec.matcher = ProfileMatcher(self.profile)
+        self.status.showMessage(f"Profile enrolled from {self.profile.sessions} session(s)")
+
+    def clear_profile(self):
+        self.profile = None
+        self.rec.matcher = None
+        PROFILE_PATH.unlink(missing_ok=True)
+        self.status.showMessage("Profile cleared")
+
+    def _profile_score(self):
+        return self.rec.matcher.score if self.rec.matcher is not None else None
+
+    def _live_metrics(self):
+        # Timer path: aggregates maintained per event, never a pass over the columns
+        m = self.rec.store.live_metrics(self.session_id, self.rec.started_at_iso,
+                                        burst_mode=self.settings.session.burst_mode,
+                                        burst_threshold_ms=self.settings.session.burst_threshold_ms,
+                                        now=time.time())
+        m.duration_secs = int(self.rec.duration_secs())
+        m.events = self.rec.total_events
+        m.profile_score = self._profile_score()
+        m.rejected = dict(self.rec.rejector.rejected)
+        return m
+
+    def _metrics(self):
+        # One fused pass over the recorder's columns (including any spilled to disk); export only
+        m = aggregate_columns(
+            session_id=self.session_id,
+            started_at=self.rec.started_at_iso,
+            duration_secs=self.rec.duration_secs(),
+            total_events=self.rec.total_events,
+            data=self.rec.store.series_chunks(),
+            profile_score=self._profile_score(),
+            rollovers=self.rec.filters.rollovers,
+            filtered=self.rec.filters.drops(),
+            burst_mode=self.settings.session.burst_mode,
+            burst_threshold_ms=self.settings.session.burst_threshold_ms,
+            rejected=dict(self.rec.rejector.rejected),
+        )
+        # Segment bursts at the same (possibly adaptive) threshold as the headline KPI
+        m.segments = self.rec.store.segment_breakdown(now=time.time(), burst_threshold_ms=m.burst_threshold_ms)
+        return m
+
     def refresh_kpis(self):
-        # Compute lightweight live KPIs using analytics.aggregate
+        # Live KPIs from incremental aggregates; cost does not grow with the session
         if self.session_id and self.rec.started_at_iso:
-            m = aggregate(
-                session_id=self.session_id,
-                started_at=self.rec.started_at_iso,
-                duration_secs=self.rec.duration_secs(),
-                total_events=self.rec.total_events,
-                holds=self.rec.holds,
-                latencies=self.rec.latencies,
-                press_timestamps_ms=self.rec.press_timestamps_ms,
-            )
+            m = self._live_metrics()
             self.lbl_events.setText(str(m.events))
             self.lbl_med_hold.setText(f"{m.median_hold_ms:.1f}")
+            hold = m.robust.get("hold", {})
+            self.lbl_med_hold.setToolTip(f"Trimmed mean {hold.get('trimmed_mean', 0.0):.1f} ms • "
+                                         f"MAD {hold.get('mad', 0.0):.1f} ms • "
+                                         f"{sum(m.rejected.values())} artifacts rejected")
             self.lbl_med_lat.setText(f"{m.median_latency_ms:.1f}")
             self.lbl_bursts.setText(str(m.bursts))
+            self.lbl_bursts.setToolTip(f"Gap threshold {m.burst_threshold_ms:.0f} ms")
             self.lbl_avg_burst.setText(f"{m.avg_burst_len:.1f}")
+            self.lbl_profile.setText("—" if m.profile_score is None else f"{m.profile_score * 100:.0f}%")
             # Update sparkline
-            self.spark.update_data([l.latency_ms for l in self.rec.latencies])
+            self.spark.update_data(self.rec.store.latency_ms.tail(100))
         else:
             self.lbl_events.setText("0"); self.lbl_med_hold.setText("0.0"); self.lbl_med_lat.setText("0.0"); self.lbl_bursts.setText("0"); self.lbl_avg_burst.setText("0.0")
+            self.lbl_profile.setText("—")
             self.spark.update_data([])
 
     def export_reports(self):
         if not self.session_id or not self.rec.started_at_iso:
             QtWidgets.QMessageBox.warning(self, "Nothing to export", "Start a session first.")
             return
-        m = aggregate(
-            session_id=self.session_id,
-            started_at=self.rec.started_at_iso,
-            duration_secs=self.rec.duration_secs(),
-            total_events=self.rec.total_events,
-            holds=self.rec.holds,
-            latencies=self.rec.latencies,
-            press_timestamps_ms=self.rec.press_timestamps_ms,
-        )
-        j = write_json(m)
-        h = write_html(m)
-        self.status.showMessage(f"Exported: {j} & {h}")
-
-        # Optional notifications
+        if self._export_thread is not None and self._export_thread.is_alive():
+            self.status.showMessage("Export already running…")
+            return
+        self.export_btn.setEnabled(False)
+        self.status.showMessage("Exporting…")
+        # The full pass may stream spilled columns back from disk; keep it off the GUI thread
+        self._export_thread = threading.Thread(target=self._export_work, name="KDynExport", daemon=True)
+        self._export_thread.start()
+
+    def _export_work(self):
+        try:
+            m = self._metrics()
+            paths = [write_json(m, index=self.history_index), write_html(m)]  # the pane's open connection
+            ex = self.settings.export
+            if ex.timeseries_ndjson:
+                paths.append(write_ndjson(m.session_id, self.rec.store))
+            if ex.arrow_format != "none" and HAVE_ARROW:
+                paths.extend(write_arrow(m.session_id, self.rec.store, fmt=ex.arrow_format))
+            n = self.settings.notifications
+            if n.use_discord or n.use_telegram:
+                summary = (
+                    f"KDyn {m.session_id}: events={m.events}, med_hold={m.median_hold_ms:.1f}ms, "
+                    f"med_lat={m.median_latency_ms:.1f}ms"
+                )
+                Notifier(n.discord_webhook if n.use_discord else None,
+                         n.telegram_token if n.use_telegram else None,
+                         n.telegram_chat_id if n.use_telegram else None
+                         ).post_summary(summary)
+            self.export_finished.emit((m, paths))
+        except Exception as e:
+            logger.warning("Export failed: %s", e)
+            self.export_finished.emit(e)
+
+    def _on_export_finished(self, result):
+        self.export_btn.setEnabled(True)
+        if isinstance(result, Exception):
+            self.status.showMessage(f"Export failed: {result}")
+            return
+        m, paths = result
+        self.history.model.cache.invalidate(m.session_id)
+        self.history.model.refresh()
+        j, h, extra = paths[0], paths[1], paths[2:]
+        msg = f"Exported: {j} & {h}" + (f" + {len(extra)} time-series file(s)" if extra else "")
         n = self.settings.notifications
         if n.use_discord or n.use_telegram:
-            summary = (
-                f"KDyn {m.session_id}: events={m.events}, med_hold={m.median_hold_ms:.1f}ms, "
-                f"med_lat={m.median_latency_ms:.1f}ms"
-            )
-            Notifier(n.discord_webhook if n.use_discord else None,
-                     n.telegram_token if n.use_telegram else None,
-                     n.telegram_chat_id if n.use_telegram else None
-                     ).post_summary(summary)
-            self.status.showMessage(self.status.currentMessage() + " • Notification sent (if configured)")
\ No newline at end of file
+            msg += " • Notification sent (if configured)"
+        self.status.showMessage(msg)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .analytics import Metrics, metrics_from_dict
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.sqlite"
+
+# (column, header) shown in the history pane; also the whitelist for ORDER BY.
+COLUMNS: List[Tuple[str, str]] = [
+    ("session_id", "Session"),
+    ("started_at", "Started"),
+    ("duration_secs", "Duration (s)"),
+    ("events", "Events"),
+    ("median_hold_ms", "Median Hold (ms)"),
+    ("median_latency_ms", "Median Latency (ms)"),
+    ("bursts", "Bursts"),
+    ("profile_score", "Profile Match"),
+]
+_COLUMN_NAMES = [c for c, _ in COLUMNS]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    started_at TEXT, duration_secs INTEGER, events INTEGER,
+    median_hold_ms REAL, median_latency_ms REAL, bursts INTEGER, profile_score REAL,
+    json_path TEXT NOT NULL, mtime REAL NOT NULL
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS idx_sessions_{c}_id ON sessions({c}, session_id);" for c in _COLUMN_NAMES[1:])}
+"""
+
+
+class SessionIndex:
+    """
+    Small SQLite index of session summaries, so browsing history never opens
+    the per-session JSON files. Safe to share across threads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _row(metrics: Metrics, json_path: Path, mtime: float) -> Tuple:
+        return tuple(getattr(metrics, c) for c in _COLUMN_NAMES) + (str(json_path), mtime)
+
+    def upsert(self, metrics: Metrics, json_path: Path) -> None:
+        self.upsert_many([(metrics, Path(json_path))])
+
+    def upsert_many(self, items: Iterable[Tuple[Metrics, Path]]) -> None:
+        rows = [self._row(m, p, p.stat().st_mtime if p.exists() else 0.0) for m, p in items]
+        placeholders = ",".join("?" * (len(_COLUMN_NAMES) + 2))
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO sessions VALUES ({placeholders})", rows)
+
+    def sync(self, reports_dir: Path) -> int:
+        """Index report JSONs that are new or changed since last seen; drop vanished ones."""
+        with self._lock:
+            known = dict(self._db.execute("SELECT json_path, mtime FROM sessions"))
+        seen = set()
+        fresh: List[Tuple[Metrics, Path]] = []
+        for p in Path(reports_dir).glob("*.json"):
+            seen.add(str(p))
+            if known.get(str(p)) == p.stat().st_mtime:
+                continue
+            try:
+                fresh.append((metrics_from_dict(json.loads(p.read_text(encoding="utf-8"))), p))
+            except Exception as e:
+                logger.warning("Skipping unreadable report %s: %s", p.name, e)
+        self.upsert_many(fresh)
+        gone = [(k,) for k in known if k not in seen]
+        if gone:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM sessions WHERE json_path = ?", gone)
+        return len(fresh)
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+
+    def page(self, offset: int, limit: int, sort_column: str = "started_at",
+             descending: bool = True) -> List[Tuple]:
+        """Summary rows (in COLUMNS order) for one page of the sorted index."""
+        if sort_column not in _COLUMN_NAMES:
+            raise ValueError(f"Unknown sort column: {sort_column}")
+        order = "DESC" if descending else "ASC"
+        # Ties broken by session_id so paging is stable; (column, session_id) indexes cover it
+        keys = f"{sort_column} {order}" if sort_column == "session_id" else f"{sort_column} {order}, session_id {order}"
+        sql = f"SELECT {', '.join(_COLUMN_NAMES)} FROM sessions ORDER BY {keys} LIMIT ? OFFSET ?"
+        with self._lock:
+            return self._db.execute(sql, (limit, offset)).fetchall()
+
+    def json_path(self, session_id: str) -> Optional[Path]:
+        with self._lock:
+            row = self._db.execute("SELECT json_path FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return Path(row[0]) if row else None
+
+
+class MetricsCache:
+    """LRU cache of fully parsed Metrics, loaded from report JSON on a miss."""
+
+    def __init__(self, index: SessionIndex, capacity: int = 256):
+        self.index = index
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Metrics]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._items
+
+    def peek(self, session_id: str) -> Optional[Metrics]:
+        """Cached value only; never touches disk (for the GUI thread)."""
+        with self._lock:
+            m = self._items.get(session_id)
+            if m is not None:
+                self._items.move_to_end(session_id)
+            return m
+
+    def get(self, session_id: str) -> Optional[Metrics]:
+        m = self.peek(session_id)
+        if m is not None:
+            self.hits += 1
+            return m
+        self.misses += 1
+        path = self.index.json_path(session_id)
+        if path is None or not path.exists():
+            return None
+        try:
+            m = metrics_from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except Exception as e:
+            logger.warning("Could not load report %s: %s", path.name, e)
+            return None
+        with self._lock:
+            self._items[session_id] = m
+            self._items.move_to_end(session_id)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return m
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._items.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class Prefetcher:
+    """Background thread that warms a MetricsCache for sessions about to be viewed."""
+
+    def __init__(self, cache: MetricsCache, on_loaded=None):
+        self.cache = cache
+        self.on_loaded = on_loaded
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="KDynPrefetch", daemon=True)
+        self._thread.start()
+
+    def request(self, session_ids: Sequence[str]) -> None:
+        for sid in session_ids:
+            if sid not in self.cache:
+                self._queue.put(sid)
+
+    def _run(self) -> None:
+        while True:
+            sid = self._queue.get()
+            try:
+                if sid is None:
+                    return
+                if sid not in self.cache and self.cache.get(sid) is not None and self.on_loaded:
+                    self.on_loaded(sid)
+            finally:
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Block until every request queued so far has been processed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=1.0)
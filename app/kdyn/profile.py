@@ -0,0 +1,223 @@
+from __future__ import annotations
+import json
+import math
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .analytics import HoldEvent
+from .settings import APP_DIR
+
+PROFILE_PATH = APP_DIR / "profile.json"
+
+# Press-to-press gaps longer than this are pauses, not digraph flights.
+MAX_FLIGHT_MS = 1500.0
+# Features seen fewer times than this across enrollment are not matched (they are still kept).
+MIN_SAMPLES = 3
+# Floor for the spread of a feature so a very regular key does not explode z-scores.
+MIN_STD_MS = 5.0
+
+Digraph = Tuple[int, int]
+
+
+@dataclass
+class FeatureStats:
+    """Running count/mean/variance (Welford) of one timing feature."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self.m2 += d * (x - self.mean)
+
+    def merge(self, other: "FeatureStats") -> None:
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return
+        n = self.count + other.count
+        d = other.mean - self.mean
+        self.mean += d * other.count / n
+        self.m2 += other.m2 + d * d * self.count * other.count / n
+        self.count = n
+
+    @property
+    def std(self) -> float:
+        return _std(self.count, self.m2)
+
+
+def _std(count: int, m2: float) -> float:
+    return math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+
+
+@dataclass
+class Profile:
+    """
+    Enrolled timing baseline: (count, mean_ms, m2) per key hold and per digraph flight.
+    Every feature is kept, however rare, so later enrollments keep accumulating it.
+    """
+    name: str
+    sessions: int = 0
+    holds: Dict[int, Tuple[int, float, float]] = field(default_factory=dict)
+    digraphs: Dict[Digraph, Tuple[int, float, float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "sessions": self.sessions,
+            "holds": {str(vk): list(s) for vk, s in sorted(self.holds.items())},
+            "digraphs": {f"{a},{b}": list(s) for (a, b), s in sorted(self.digraphs.items())},
+        }
+
+    @staticmethod
+    def from_dict(data: Dict) -> "Profile":
+        def stats(s) -> Tuple[int, float, float]:
+            return int(s[0]), float(s[1]), float(s[2])
+
+        holds = {int(vk): stats(s) for vk, s in data.get("holds", {}).items()}
+        digraphs = {}
+        for key, s in data.get("digraphs", {}).items():
+            a, b = key.split(",")
+            digraphs[(int(a), int(b))] = stats(s)
+        return Profile(name=str(data.get("name", "default")), sessions=int(data.get("sessions", 0)),
+                       holds=holds, digraphs=digraphs)
+
+
+class ProfileBuilder:
+    """Accumulates hold and digraph flight-time distributions over one or more sessions."""
+
+    def __init__(self, max_flight_ms: float = MAX_FLIGHT_MS):
+        self.max_flight_ms = max_flight_ms
+        self.sessions = 0
+        self._holds: Dict[int, FeatureStats] = {}
+        self._digraphs: Dict[Digraph, FeatureStats] = {}
+
+    @staticmethod
+    def from_profile(profile: Profile, max_flight_ms: float = MAX_FLIGHT_MS) -> "ProfileBuilder":
+        """Seed a builder with an existing profile so further sessions extend it."""
+        b = ProfileBuilder(max_flight_ms)
+        b.sessions = profile.sessions
+        for vk, s in profile.holds.items():
+            b._holds[vk] = FeatureStats(*s)
+        for dg, s in profile.digraphs.items():
+            b._digraphs[dg] = FeatureStats(*s)
+        return b
+
+    def add_session(self, holds: Iterable[HoldEvent], press_codes: Iterable[int],
+                    press_timestamps_ms: Iterable[float]) -> None:
+        """Inputs are consumed once, so streamed (e.g. spilled) columns never need to fit in memory."""
+        for h in holds:
+            self._holds.setdefault(h.code, FeatureStats()).add(h.hold_ms)
+        prev_vk = prev_ts = None
+        for vk, ts in zip(press_codes, press_timestamps_ms):
+            if prev_vk is not None and 0.0 <= ts - prev_ts <= self.max_flight_ms:
+                self._digraphs.setdefault((prev_vk, vk), FeatureStats()).add(ts - prev_ts)
+            prev_vk, prev_ts = vk, ts
+        self.sessions += 1
+
+    def build(self, name: str) -> Profile:
+        def summarize(stats: Dict) -> Dict:
+            return {k: (s.count, s.mean, s.m2) for k, s in stats.items()}
+        return Profile(name=name, sessions=self.sessions,
+                       holds=summarize(self._holds), digraphs=summarize(self._digraphs))
+
+
+def enroll(name: str, sessions: Iterable[Tuple[Iterable[HoldEvent], Iterable[int], Iterable[float]]]) -> Profile:
+    """
+    sessions: (holds, press_codes, press_timestamps_ms) per recorded session.
+    Returns: the enrolled Profile.
+    """
+    b = ProfileBuilder()
+    for holds, codes, stamps in sessions:
+        b.add_session(holds, codes, stamps)
+    return b.build(name)
+
+
+class ProfileMatcher:
+    """
+    Scores a live event stream against a Profile in constant time per event.
+
+    Every feature is assigned a slot once; means and inverse spreads live in flat
+    arrays so scoring an event is one dict lookup and a few float ops. The score is
+    the mean per-feature similarity in [0, 1], where 1 is exactly on the baseline
+    mean and 0 is `z_cap` or more standard deviations away. Features enrolled fewer
+    than `min_samples` times are not matched.
+    """
+
+    def __init__(self, profile: Profile, z_cap: float = 4.0, max_flight_ms: float = MAX_FLIGHT_MS,
+                 min_samples: int = MIN_SAMPLES):
+        self.profile = profile
+        self.z_cap = z_cap
+        self.max_flight_ms = max_flight_ms
+        self._hold_slot: Dict[int, int] = {}
+        self._digraph_slot: Dict[Digraph, int] = {}
+        self._mean = array("d")
+        self._inv_std = array("d")
+        for vk, (count, mean, m2) in profile.holds.items():
+            if count >= min_samples:
+                self._hold_slot[vk] = self._add_slot(mean, _std(count, m2))
+        for dg, (count, mean, m2) in profile.digraphs.items():
+            if count >= min_samples:
+                self._digraph_slot[dg] = self._add_slot(mean, _std(count, m2))
+        self.reset()
+
+    def _add_slot(self, mean: float, std: float) -> int:
+        self._mean.append(mean)
+        self._inv_std.append(1.0 / max(std, MIN_STD_MS))
+        return len(self._mean) - 1
+
+    @property
+    def features(self) -> int:
+        return len(self._mean)
+
+    def reset(self) -> None:
+        self.matched = 0
+        self._similarity_sum = 0.0
+        self._prev_vk: Optional[int] = None
+        self._prev_ts_ms: Optional[float] = None
+
+    def _score(self, slot: int, value: float) -> None:
+        z = abs(value - self._mean[slot]) * self._inv_std[slot]
+        self._similarity_sum += 1.0 - min(z, self.z_cap) / self.z_cap
+        self.matched += 1
+
+    def on_press(self, vk: int, ts_ms: float) -> None:
+        if self._prev_vk is not None:
+            flight = ts_ms - self._prev_ts_ms
+            if 0.0 <= flight <= self.max_flight_ms:
+                slot = self._digraph_slot.get((self._prev_vk, vk))
+                if slot is not None:
+                    self._score(slot, flight)
+        self._prev_vk = vk
+        self._prev_ts_ms = ts_ms
+
+    def on_hold(self, vk: int, hold_ms: float) -> None:
+        slot = self._hold_slot.get(vk)
+        if slot is not None:
+            self._score(slot, hold_ms)
+
+    @property
+    def score(self) -> Optional[float]:
+        return self._similarity_sum / self.matched if self.matched else None
+
+
+def save_profile(profile: Profile, path: Optional[Path] = None) -> Path:
+    path = path or PROFILE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profile.to_dict(), indent=2), encoding="utf-8")
+    return path
+
+
+def load_profile(path: Optional[Path] = None) -> Optional[Profile]:
+    path = path or PROFILE_PATH
+    if not path.exists():
+        return None
+    try:
+        return Profile.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except Exception:
+        return None
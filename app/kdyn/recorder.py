@@ -1,39 +1,143 @@
 from __future__ import annotations
 import threading
 import time
-from typing import Optional, List, Dict
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Optional, List, Dict, Iterator
 from pynput import keyboard
 import logging
 from .analytics import HoldEvent, LatencyEvent
+from .profile import ProfileMatcher
+from .filters import FilterChain, build_chain
+from .robust import OutlierRejector, RejectionPolicy
+from .store import EventStore, DEFAULT_MEMORY_BUDGET
 
 logger = logging.getLogger(__name__)
 
 # IMPORTANT: Do not log plaintext. We only store anonymized key codes and timings.
 
+
+class RecorderState(str, Enum):
+    IDLE = "idle"
+    RECORDING = "recording"
+    PAUSED = "paused"
+    STOPPED = "stopped"
+
+
+ACTIVE_STATES = frozenset({RecorderState.RECORDING, RecorderState.PAUSED})
+
+# Called as listener(old, new) after a transition, from whichever thread made it
+StateListener = Callable[[RecorderState, RecorderState], None]
+
+
 class Recorder:
-    def __init__(self, max_duration_sec: int = 120, idle_timeout_sec: int = 10):
+    """
+    Keystroke timing recorder driven by an explicit state machine:
+
+        IDLE/STOPPED --start--> RECORDING <--pause/resume--> PAUSED
+        RECORDING/PAUSED --stop--> STOPPED;  any --reset--> IDLE
+
+    Hook callbacks hold the lock only for the state check and per-event bookkeeping;
+    their store appends (which may spill to disk) run outside it and are tracked as
+    in flight. Transitions are serialized and drain in-flight appends before closing
+    a segment, so an event is either fully recorded inside an open segment or counted
+    as ignored. Each start bumps a generation; callbacks from an older listener or
+    supervisor are ignored.
+    """
+
+    def __init__(self, max_duration_sec: int = 120, idle_timeout_sec: int = 10,
+                 filters: Optional[FilterChain] = None, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET,
+                 rejection: Optional[RejectionPolicy] = None,
+                 listener_factory: Optional[Callable[..., Any]] = None):
         self.max_duration_sec = max_duration_sec
         self.idle_timeout_sec = idle_timeout_sec
+        # Pre-storage pipeline (autorepeat collapsing, modifier exclusion, rollover stats)
+        self.filters = filters if filters is not None else build_chain()
+        # Online artifact rejection (caps + robust fences); rejected samples never reach the store
+        self.rejector = OutlierRejector(rejection)
 
-        self._listener: Optional[keyboard.Listener] = None
+        self._listener_factory = listener_factory or keyboard.Listener
+        self._listener: Optional[Any] = None
         self._thread: Optional[threading.Thread] = None
-        self._running = threading.Event()
-        self._paused = threading.Event()
-        self._paused.set()  # start paused until Start() called
+        self._lock = threading.Lock()
+        # Signalled when the last in-flight store append finishes
+        self._drained = threading.Condition(self._lock)
+        self._inflight = 0
+        # Serializes transitions, including while one waits for a drain with _lock released
+        self._transition_lock = threading.Lock()
+        self._state = RecorderState.IDLE
+        self._generation = 0
+        self._state_listeners: List[StateListener] = []
 
         self.started_at_iso: Optional[str] = None
         self.start_ts: Optional[float] = None
         self.last_event_ts: Optional[float] = None
+        # Previous event within the current activity segment; latencies never span a pause
+        self._prev_event_ts: Optional[float] = None
 
         self.total_events = 0
-        self.holds: List[HoldEvent] = []
-        self.latencies: List[LatencyEvent] = []
+        # Lifetime dispatch counts (not cleared by reset): presses/releases handled while
+        # recording, events ignored in any other state, and stored presses cleared by reset
+        self.counters: Dict[str, int] = {"presses": 0, "releases": 0, "ignored": 0, "cleared": 0}
         self._press_times: Dict[int, float] = {}
-        self._press_timestamps_ms: List[float] = []
+        # Last sign of life per pending press: the press itself or a dropped autorepeat
+        self._press_seen: Dict[int, float] = {}
+        # Array-backed event columns; spills to disk beyond the memory budget
+        self.store = EventStore(memory_budget_bytes=memory_budget_bytes)
+
+        # Optional live scoring against an enrolled profile
+        self.matcher: Optional[ProfileMatcher] = None
+
+    @property
+    def state(self) -> RecorderState:
+        return self._state
+
+    @property
+    def listener(self) -> Optional[Any]:
+        return self._listener
+
+    def add_state_listener(self, fn: StateListener) -> None:
+        self._state_listeners.append(fn)
+
+    def remove_state_listener(self, fn: StateListener) -> None:
+        if fn in self._state_listeners:
+            self._state_listeners.remove(fn)
+
+    def _notify(self, old: RecorderState, new: RecorderState) -> None:
+        # Outside the lock: listeners may call back into the recorder. Notifications from
+        # concurrent transitions can interleave, so listeners should read `state` for the latest.
+        if old is new:
+            return
+        for fn in list(self._state_listeners):
+            try:
+                fn(old, new)
+            except Exception:
+                logger.exception("State listener failed")
+
+    @property
+    def holds(self) -> List[HoldEvent]:
+        return list(self.store.iter_holds())
+
+    @property
+    def latencies(self) -> List[LatencyEvent]:
+        return list(self.store.iter_latencies())
 
     @property
     def press_timestamps_ms(self) -> List[float]:
-        return list(self._press_timestamps_ms)
+        return list(self.store.press_ts_ms)
+
+    @property
+    def press_codes(self) -> List[int]:
+        return list(self.store.press_vk)
+
+    def iter_holds(self) -> Iterator[HoldEvent]:
+        return self.store.iter_holds()
+
+    def iter_latencies(self) -> Iterator[LatencyEvent]:
+        return self.store.iter_latencies()
+
+    def iter_press_timestamps_ms(self) -> Iterator[float]:
+        return iter(self.store.press_ts_ms)
 
     def _vk_of(self, key) -> Optional[int]:
         try:
@@ -45,92 +149,248 @@ class Recorder:
             return None
         return None
 
-    def _on_press(self, key):
-        if not self._running.is_set() or self._paused.is_set():
-            return
-        now = time.time()
+    def _accepts(self, generation: Optional[int]) -> bool:
+        # Caller holds the lock
+        return self._state is RecorderState.RECORDING and (generation is None or generation == self._generation)
+
+    def _on_press(self, key, generation: Optional[int] = None):
         vk = self._vk_of(key)
-        if vk is None:
-            return
-        self.total_events += 1
-        self._press_times[vk] = now
-        self._press_timestamps_ms.append(now * 1000.0)
-        if self.last_event_ts is not None:
-            self.latencies.append(LatencyEvent(latency_ms=(now - self.last_event_ts) * 1000.0))
-        self.last_event_ts = now
-
-    def _on_release(self, key):
-        if not self._running.is_set() or self._paused.is_set():
-            return
-        now = time.time()
+        with self._lock:
+            if vk is None or not self._accepts(generation):
+                self.counters["ignored"] += 1
+                return
+            self.counters["presses"] += 1
+            now = time.time()
+            if vk in self._press_times:
+                self._press_seen[vk] = now  # a repeat proves the key is still down
+            if not self.filters.on_press(vk, now):
+                return
+            self.total_events += 1
+            self._press_times[vk] = now
+            self._press_seen[vk] = now
+            if self.matcher is not None:
+                self.matcher.on_press(vk, now * 1000.0)
+            latency_ms = None
+            if self._prev_event_ts is not None:
+                latency_ms = (now - self._prev_event_ts) * 1000.0
+                if not self.rejector.accept_latency(latency_ms):
+                    latency_ms = None
+            self._prev_event_ts = now
+            self.last_event_ts = now
+            self._inflight += 1
+        try:
+            self.store.add_press(vk, now * 1000.0)
+            if latency_ms is not None:
+                self.store.add_latency(latency_ms)
+        finally:
+            self._append_done()
+
+    def _on_release(self, key, generation: Optional[int] = None):
         vk = self._vk_of(key)
-        if vk is None:
-            return
-        t0 = self._press_times.pop(vk, None)
-        if t0 is not None:
-            hold_ms = (now - t0) * 1000.0
-            self.holds.append(HoldEvent(code=vk, hold_ms=hold_ms))
-        self.last_event_ts = now
+        with self._lock:
+            if vk is None or not self._accepts(generation):
+                self.counters["ignored"] += 1
+                return
+            self.counters["releases"] += 1
+            now = time.time()
+            if not self.filters.on_release(vk, now):
+                return
+            t0 = self._press_times.pop(vk, None)
+            self._press_seen.pop(vk, None)
+            hold_ms = None
+            if t0 is not None:
+                hold_ms = (now - t0) * 1000.0
+                if not self.rejector.accept_hold(vk, hold_ms):
+                    hold_ms = None
+                elif self.matcher is not None:
+                    self.matcher.on_hold(vk, hold_ms)
+            self._prev_event_ts = now
+            self.last_event_ts = now
+            if hold_ms is None:
+                return
+            self._inflight += 1
+        try:
+            self.store.add_hold(vk, hold_ms)
+        finally:
+            self._append_done()
+
+    def _append_done(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if not self._inflight:
+                self._drained.notify_all()
+
+    def _drain_locked(self) -> None:
+        """Wait (releasing the lock) until no store append is in flight; caller holds both locks."""
+        self._drained.wait_for(lambda: not self._inflight)
 
-    def _run(self):
+    def _evict_locked(self, now: float, max_age: float) -> int:
+        evicted = 0
+        for vk, seen in list(self._press_seen.items()):
+            if now - seen >= max_age:
+                del self._press_times[vk], self._press_seen[vk]
+                self.filters.forget(vk)
+                evicted += 1
+        if evicted:
+            self.rejector.count("stale_press", evicted)
+        return evicted
+
+    def evict_stale_presses(self, now: Optional[float] = None, max_age_sec: Optional[float] = None) -> int:
+        """
+        Drop pending presses with no sign of life (the press or an autorepeat of it)
+        for max_age_sec (default: the rejection policy's stale_press_sec; 0 drops
+        all). Their releases were missed (e.g. focus change), so they would otherwise
+        pin memory and later yield a bogus hold. A key held down keeps repeating and
+        is never evicted.
+        """
+        max_age = self.rejector.policy.stale_press_sec if max_age_sec is None else max_age_sec
+        with self._lock:
+            return self._evict_locked(time.time() if now is None else now, max_age)
+
+    def _run(self, generation: int):
         logger.info("Recorder thread started")
-        with keyboard.Listener(on_press=self._on_press, on_release=self._on_release) as listener:
-            self._listener = listener
-            while self._running.is_set():
-                if self.start_ts and self.max_duration_sec > 0:
-                    if time.time() - self.start_ts >= self.max_duration_sec:
-                        logger.info("Max duration reached; stopping")
-                        self.stop()
-                        break
-                if self.last_event_ts and self.idle_timeout_sec > 0 and not self._paused.is_set():
-                    if time.time() - self.last_event_ts >= self.idle_timeout_sec:
-                        logger.info("Idle timeout reached; auto-pausing")
-                        self.pause()
-                time.sleep(0.05)
+        while self._generation == generation and self._state in ACTIVE_STATES:
+            now = time.time()
+            if self.start_ts and self.max_duration_sec > 0 and now - self.start_ts >= self.max_duration_sec:
+                logger.info("Max duration reached; stopping")
+                self._stop(generation)
+                break
+            if self.idle_timeout_sec > 0 and self._state is RecorderState.RECORDING:
+                if self._pause(generation, idle_cutoff=now - self.idle_timeout_sec):
+                    logger.info("Idle timeout reached; auto-pausing")
+            if self._press_times:
+                self.evict_stale_presses()
+            time.sleep(0.05)
         logger.info("Recorder thread exiting")
 
-    def start(self, started_at_iso: str):
-        if self._running.is_set():
+    def start(self, started_at_iso: str) -> bool:
+        """IDLE/STOPPED -> RECORDING; data from an earlier stop is kept (new segment)."""
+        with self._transition_lock, self._lock:
+            old = self._state
+            if old in ACTIVE_STATES:
+                return False
+            self._generation += 1
+            gen = self._generation
+            now = time.time()
+            self.started_at_iso = started_at_iso
+            self.start_ts = now
+            self.last_event_ts = None  # idle timeout counts from the first event
+            self._prev_event_ts = None
+            self.store.begin_segment(now)
+            self._state = RecorderState.RECORDING
+            self._listener = self._listener_factory(on_press=partial(self._on_press, generation=gen),
+                                                    on_release=partial(self._on_release, generation=gen))
+            self._listener.start()
+            self._thread = threading.Thread(target=self._run, args=(gen,), name="KDynRecorder", daemon=True)
+            self._thread.start()
+        self._notify(old, RecorderState.RECORDING)
+        return True
+
+    def _close_segment_locked(self) -> None:
+        # The state already rejects new events; let accepted ones land before the segment ends
+        self._drain_locked()
+        # Keys still down (e.g. Ctrl of Ctrl+P) will release unseen; drop them, they are not artifacts
+        self.filters.clear_held()
+        self._press_times.clear()
+        self._press_seen.clear()
+        self.store.end_segment(time.time())
+
+    def _pause(self, generation: Optional[int] = None, idle_cutoff: Optional[float] = None) -> bool:
+        with self._transition_lock, self._lock:
+            if not self._accepts(generation):
+                return False
+            if idle_cutoff is not None and (self.last_event_ts is None or self.last_event_ts > idle_cutoff):
+                return False
+            self._state = RecorderState.PAUSED
+            self._close_segment_locked()
+        self._notify(RecorderState.RECORDING, RecorderState.PAUSED)
+        return True
+
+    def pause(self) -> bool:
+        """RECORDING -> PAUSED; returns False if not recording."""
+        return self._pause()
+
+    def resume(self) -> bool:
+        """PAUSED -> RECORDING; returns False if not paused."""
+        with self._transition_lock, self._lock:
+            if self._state is not RecorderState.PAUSED:
+                return False
+            now = time.time()
+            self.last_event_ts = now
+            self._prev_event_ts = None
+            self.store.begin_segment(now)
+            self._state = RecorderState.RECORDING
+        self._notify(RecorderState.PAUSED, RecorderState.RECORDING)
+        return True
+
+    def toggle_pause(self) -> Optional[RecorderState]:
+        """Pause if recording, resume if paused; returns the new state, or None if neither."""
+        with self._lock:
+            state = self._state
+        if state is RecorderState.RECORDING and self.pause():
+            return RecorderState.PAUSED
+        if state is RecorderState.PAUSED and self.resume():
+            return RecorderState.RECORDING
+        return None
+
+    def _halt_locked(self) -> Optional[Any]:
+        """Close the segment and detach the listener; caller holds the locks and stops it after."""
+        self._close_segment_locked()
+        listener, self._listener = self._listener, None
+        return listener
+
+    @staticmethod
+    def _stop_listener(listener: Optional[Any]) -> None:
+        if listener is None:
             return
-        self.reset(clear_data=False)
-        self.started_at_iso = started_at_iso
-        self.start_ts = time.time()
-        self._running.set()
-        self._paused.clear()
-        self._thread = threading.Thread(target=self._run, name="KDynRecorder", daemon=True)
-        self._thread.start()
-
-    def pause(self):
-        self._paused.set()
-
-    def resume(self):
-        if self._running.is_set():
-            self._paused.clear()
-            self.last_event_ts = time.time()
-
-    def stop(self):
-        self._paused.set()
-        self._running.clear()
-        if self._listener:
-            try:
-                self._listener.stop()
-            except Exception:
-                pass
-        self._listener = None
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+    def _stop(self, generation: Optional[int] = None) -> bool:
+        with self._transition_lock, self._lock:
+            old = self._state
+            if old not in ACTIVE_STATES or (generation is not None and generation != self._generation):
+                return False
+            self._state = RecorderState.STOPPED
+            listener = self._halt_locked()
+        self._stop_listener(listener)
+        self._notify(old, RecorderState.STOPPED)
+        return True
+
+    def stop(self) -> bool:
+        """RECORDING/PAUSED -> STOPPED; returns False if not active."""
+        return self._stop()
 
     def reset(self, clear_data: bool = True):
-        self.stop()
-        if clear_data:
-            self.total_events = 0
-            self.holds.clear()
-            self.latencies.clear()
-            self._press_times.clear()
-            self._press_timestamps_ms.clear()
-            self.started_at_iso = None
-            self.start_ts = None
-            self.last_event_ts = None
+        """Stop if active; with clear_data, also drop all events and return to IDLE."""
+        if not clear_data:
+            self.stop()
+            return
+        with self._transition_lock:
+            with self._lock:
+                old = self._state
+                self._state = RecorderState.IDLE  # from here on events are ignored
+                listener = self._halt_locked() if old in ACTIVE_STATES else None
+                self.counters["cleared"] += self.total_events
+                self.total_events = 0
+                self._press_times.clear()
+                self._press_seen.clear()
+                self.filters.reset()
+                self.rejector.reset()
+                if self.matcher is not None:
+                    self.matcher.reset()
+                self.started_at_iso = None
+                self.start_ts = None
+                self.last_event_ts = None
+                self._prev_event_ts = None
+            # Deleting spill files can be slow; hook callbacks only ever wait on _lock
+            self.store.clear()
+        self._stop_listener(listener)
+        self._notify(old, RecorderState.IDLE)
 
     def duration_secs(self) -> int:
         if not self.start_ts:
             return 0
-        return int(time.time() - self.start_ts)
\ No newline at end of file
+        return int(time.time() - self.start_ts)
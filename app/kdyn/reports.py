@@ -2,10 +2,16 @@ from __future__ import annotations
 import json
 from dataclasses import asdict
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 from jinja2 import Template
 from .analytics import Metrics
+from .history import SessionIndex, INDEX_NAME
+from .store import EventStore
+from .export import export_ndjson, export_arrow
 import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 REPORTS_DIR = Path("./reports")
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -45,8 +51,12 @@ _HTML = """
       <div class="card"><div class="muted">Median Hold (ms)</div><div style="font-size:28px;">{{ '%.1f' % m.median_hold_ms }}</div></div>
       <div class="card"><div class="muted">Median Latency (ms)</div><div style="font-size:28px;">{{ '%.1f' % m.median_latency_ms }}</div></div>
       <div class="card"><div class="muted">p95 Latency (ms)</div><div style="font-size:28px;">{{ '%.1f' % m.p95_latency_ms }}</div></div>
-      <div class="card"><div class="muted">Bursts</div><div style="font-size:28px;">{{ m.bursts }}</div></div>
+      <div class="card"><div class="muted">Bursts (&lt; {{ '%.0f' % m.burst_threshold_ms }} ms gaps)</div><div style="font-size:28px;">{{ m.bursts }}</div></div>
       <div class="card"><div class="muted">Avg Burst Length</div><div style="font-size:28px;">{{ '%.1f' % m.avg_burst_len }}</div></div>
+      <div class="card"><div class="muted">Key Rollovers</div><div style="font-size:28px;">{{ m.rollovers }}</div></div>
+      {% if m.profile_score is not none %}
+      <div class="card"><div class="muted">Profile Match</div><div style="font-size:28px;">{{ '%.0f' % (m.profile_score * 100) }}%</div></div>
+      {% endif %}
     </div>
 
     <div class="card" style="margin-top:16px;">
@@ -66,6 +76,99 @@ _HTML = """
       </table>
     </div>
 
+    {% if m.burst_profile %}
+    <div class="card" style="margin-top:16px;">
+      <h2>Burst Segmentation by Threshold</h2>
+      <table>
+        <thead><tr><th>Gap Threshold (ms)</th><th>Bursts</th><th>Avg Length</th><th>Median Length</th><th>p95 Length</th><th>Max Length</th></tr></thead>
+        <tbody>
+          {% for b in m.burst_profile %}
+            <tr>
+              <td>{{ '%.0f' % b.threshold_ms }}</td>
+              <td>{{ b.bursts }}</td>
+              <td>{{ '%.1f' % b.avg_len }}</td>
+              <td>{{ '%.1f' % b.median_len }}</td>
+              <td>{{ '%.1f' % b.p95_len }}</td>
+              <td>{{ b.max_len }}</td>
+            </tr>
+          {% endfor %}
+        </tbody>
+      </table>
+    </div>
+    {% endif %}
+
+    {% if m.segments %}
+    <div class="card" style="margin-top:16px;">
+      <h2>Activity Segments</h2>
+      <table>
+        <thead><tr><th>#</th><th>Duration (s)</th><th>Events</th><th>Median Hold (ms)</th><th>Median Latency (ms)</th><th>Bursts (gap &ge; {{ '%.0f' % m.segments[0].get('burst_threshold_ms', m.burst_threshold_ms) }} ms)</th></tr></thead>
+        <tbody>
+          {% for s in m.segments %}
+            <tr>
+              <td>{{ s.index + 1 }}</td>
+              <td>{{ '%.1f' % s.duration_secs }}</td>
+              <td>{{ s.events }}</td>
+              <td>{{ '%.1f' % s.median_hold_ms }}</td>
+              <td>{{ '%.1f' % s.median_latency_ms }}</td>
+              <td>{{ s.bursts }}</td>
+            </tr>
+          {% endfor %}
+        </tbody>
+      </table>
+    </div>
+    {% endif %}
+
+    {% if m.robust %}
+    <div class="card" style="margin-top:16px;">
+      <h2>Robust Statistics</h2>
+      <table>
+        <thead><tr><th>Series</th><th>Count</th><th>Median (ms)</th><th>MAD (ms)</th><th>IQR (ms)</th><th>Trimmed Mean (ms)</th><th>Winsorized Mean (ms)</th></tr></thead>
+        <tbody>
+          {% for name, r in m.robust.items() %}
+            <tr>
+              <td>{{ name }}</td>
+              <td>{{ r.count }}</td>
+              <td>{{ '%.1f' % r.median }}</td>
+              <td>{{ '%.1f' % r.mad }}</td>
+              <td>{{ '%.1f' % r.iqr }}</td>
+              <td>{{ '%.1f' % r.trimmed_mean }}</td>
+              <td>{{ '%.1f' % r.winsorized_mean }}</td>
+            </tr>
+          {% endfor %}
+        </tbody>
+      </table>
+    </div>
+    {% endif %}
+
+    {% if m.extras %}
+    <div class="card" style="margin-top:16px;">
+      <h2>Custom Metrics</h2>
+      <table>
+        <thead><tr><th>Metric</th><th>Value</th></tr></thead>
+        <tbody>
+          {% for name, v in m.extras.items() %}
+            <tr>
+              <td>{{ name }}</td>
+              <td>{% if v is float %}{{ '%.2f' % v }}{% elif v is mapping or (v is iterable and v is not string) %}<code>{{ v | tojson }}</code>{% else %}{{ v }}{% endif %}</td>
+            </tr>
+          {% endfor %}
+        </tbody>
+      </table>
+    </div>
+    {% endif %}
+
+    {% if m.filtered %}
+    <div class="muted" style="margin-top:12px;">Filtered events:
+      {% for name, n in m.filtered.items() %}{{ name }}={{ n }}{% if not loop.last %} • {% endif %}{% endfor %}
+    </div>
+    {% endif %}
+
+    {% if m.rejected %}
+    <div class="muted" style="margin-top:12px;">Rejected artifacts:
+      {% for reason, n in m.rejected.items() %}{{ reason }}={{ n }}{% if not loop.last %} • {% endif %}{% endfor %}
+    </div>
+    {% endif %}
+
     <div class="muted" style="margin-top:12px;">Generated by KDyn on {{ now }}</div>
   </div>
 </body>
@@ -73,7 +176,8 @@ _HTML = """
 """
 
 
-def write_json(metrics: Metrics) -> Path:
+def write_json(metrics: Metrics, index: Optional[SessionIndex] = None) -> Path:
+    """Write the JSON report and index it; pass an open `index` to reuse its connection across a batch."""
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     path = REPORTS_DIR / f"{metrics.session_id}.json"
     data = {
@@ -89,11 +193,46 @@ def write_json(metrics: Metrics) -> Path:
         "bursts": metrics.bursts,
         "avg_burst_len": metrics.avg_burst_len,
         "per_key": metrics.per_key,
+        "profile_score": metrics.profile_score,
+        "rollovers": metrics.rollovers,
+        "filtered": metrics.filtered,
+        "burst_threshold_ms": metrics.burst_threshold_ms,
+        "burst_profile": metrics.burst_profile,
+        "segments": metrics.segments,
+        "extras": metrics.extras,
+        "rejected": metrics.rejected,
+        "robust": metrics.robust,
     }
     path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    _index_report(metrics, path, index)
     return path
 
 
+def _index_report(metrics: Metrics, path: Path, index: Optional[SessionIndex] = None) -> None:
+    # Keep the history index current so the GUI never has to rescan every JSON
+    try:
+        if index is not None:
+            index.upsert(metrics, path)
+            return
+        own = SessionIndex(REPORTS_DIR / INDEX_NAME)
+        try:
+            own.upsert(metrics, path)
+        finally:
+            own.close()
+    except Exception as e:
+        logger.warning("Could not update history index: %s", e)
+
+
+def write_ndjson(session_id: str, store: EventStore) -> Path:
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return export_ndjson(store, REPORTS_DIR / f"{session_id}.events.ndjson", session_id=session_id)
+
+
+def write_arrow(session_id: str, store: EventStore, fmt: str = "ipc") -> List[Path]:
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return export_arrow(store, REPORTS_DIR / f"{session_id}.events", fmt=fmt)
+
+
 def write_html(metrics: Metrics) -> Path:
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     path = REPORTS_DIR / f"{metrics.session_id}.html"
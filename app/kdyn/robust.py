@@ -0,0 +1,282 @@
+from __future__ import annotations
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Log-spaced bins: each is ~5% wide, so quantiles from a histogram are within ~2.5%.
+_BIN_BASE = 1.05
+_LOG_BASE = math.log(_BIN_BASE)
+
+# Floor for the log-domain spread so very regular streams do not get razor-thin fences.
+MIN_LOG_SPREAD = 0.1
+# MAD -> standard deviation for normal data.
+MAD_SCALE = 1.4826
+
+
+def bin_of(x: float) -> int:
+    return int(math.log(x) / _LOG_BASE) if x >= 1.0 else 0
+
+
+def bin_mid(b: int) -> float:
+    return _BIN_BASE ** (b + 0.5)
+
+
+class LogHistogram:
+    """
+    Sparse log-binned histogram of positive durations (ms). Constant memory per
+    distinct bin, exact count/sum, mergeable, approximate quantiles.
+    """
+    __slots__ = ("bins", "count", "total")
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, x: float) -> None:
+        b = bin_of(x)
+        self.bins[b] = self.bins.get(b, 0) + 1
+        self.count += 1
+        self.total += x
+
+    def merge(self, other: "LogHistogram") -> None:
+        for b, n in other.bins.items():
+            self.bins[b] = self.bins.get(b, 0) + n
+        self.count += other.count
+        self.total += other.total
+
+    def copy(self) -> "LogHistogram":
+        h = LogHistogram()
+        h.merge(self)
+        return h
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile_bin(self, p: float) -> int:
+        rank = p * (self.count - 1)
+        seen = 0
+        for b in sorted(self.bins):
+            seen += self.bins[b]
+            if seen > rank:
+                return b
+        return max(self.bins)
+
+    def quantile(self, p: float) -> float:
+        """Geometric midpoint of the bin holding the p-quantile."""
+        return bin_mid(self.quantile_bin(p)) if self.count else 0.0
+
+    def count_at_least(self, x: float) -> int:
+        """Values whose bin midpoint is >= x (approximate at x's own bin)."""
+        return sum(n for b, n in self.bins.items() if bin_mid(b) >= x)
+
+
+class RobustEstimator:
+    """Constant-memory robust location/scale estimates over one stream of durations."""
+    __slots__ = ("hist",)
+
+    def __init__(self, hist: Optional[LogHistogram] = None):
+        self.hist = hist if hist is not None else LogHistogram()
+
+    @property
+    def count(self) -> int:
+        return self.hist.count
+
+    def add(self, x: float) -> None:
+        self.hist.add(x)
+
+    def median(self) -> float:
+        return self.hist.quantile(0.5)
+
+    def iqr(self) -> float:
+        return self.hist.quantile(0.75) - self.hist.quantile(0.25)
+
+    def mad(self) -> float:
+        """Median absolute deviation from the median (ms)."""
+        if not self.hist.count:
+            return 0.0
+        med = self.median()
+        devs = sorted((abs(bin_mid(b) - med), n) for b, n in self.hist.bins.items())
+        rank = 0.5 * (self.hist.count - 1)
+        seen = 0
+        for d, n in devs:
+            seen += n
+            if seen > rank:
+                return d
+        return devs[-1][0]
+
+    def _clipped_sum(self, lo_rank: float, hi_rank: float) -> Tuple[float, int]:
+        """Sum/count of values whose rank lies in [lo_rank, hi_rank), using bin midpoints."""
+        total, n, start = 0.0, 0, 0
+        for b in sorted(self.hist.bins):
+            c = self.hist.bins[b]
+            take = max(0.0, min(start + c, hi_rank) - max(start, lo_rank))
+            total += take * bin_mid(b)
+            n += take
+            start += c
+        return total, n
+
+    def trimmed_mean(self, trim: float = 0.1) -> float:
+        """Mean of the central (1 - 2*trim) share of values."""
+        c = self.hist.count
+        if not c:
+            return 0.0
+        total, n = self._clipped_sum(trim * c, (1.0 - trim) * c)
+        return total / n if n else self.median()
+
+    def winsorized_mean(self, limit: float = 0.05) -> float:
+        """Mean with the lowest/highest `limit` share clamped to the boundary quantiles."""
+        c = self.hist.count
+        if not c:
+            return 0.0
+        lo, hi = limit * c, (1.0 - limit) * c
+        total, _ = self._clipped_sum(lo, hi)
+        total += lo * self.hist.quantile(limit) + (c - hi) * self.hist.quantile(1.0 - limit)
+        return total / c
+
+    def log_fence(self, method: str, k: float) -> Tuple[float, float]:
+        """
+        (lo, hi) acceptance range in ms. Fences are computed on log-durations, where
+        timing distributions are roughly symmetric, so long-but-plausible gaps survive.
+        """
+        if method == "iqr":
+            q1, q3 = self.hist.quantile_bin(0.25), self.hist.quantile_bin(0.75)
+            spread = max((q3 - q1) * _LOG_BASE, MIN_LOG_SPREAD)
+            return math.exp((q1 + 0.5) * _LOG_BASE - k * spread), math.exp((q3 + 0.5) * _LOG_BASE + k * spread)
+        m = self.hist.quantile_bin(0.5)
+        devs = sorted((abs(b - m), n) for b, n in self.hist.bins.items())
+        rank, seen, mad_bins = 0.5 * (self.hist.count - 1), 0, 0
+        for d, n in devs:
+            seen += n
+            if seen > rank:
+                mad_bins = d
+                break
+        spread = max(mad_bins * _LOG_BASE * MAD_SCALE, MIN_LOG_SPREAD)
+        center = (m + 0.5) * _LOG_BASE
+        return math.exp(center - k * spread), math.exp(center + k * spread)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.hist.count,
+            "median": self.median(),
+            "mad": self.mad(),
+            "iqr": self.iqr(),
+            "trimmed_mean": self.trimmed_mean(),
+            "winsorized_mean": self.winsorized_mean(),
+        }
+
+
+@dataclass
+class RejectionPolicy:
+    """
+    Online artifact rejection. `method` is "mad", "iqr" or "none"; `k` defaults to
+    3.5 (MAD) or 3.0 (IQR). Hard caps reject regardless of the learned distribution.
+    When more than `shift_reject_rate` of a `refresh_every` block is rejected, the
+    distribution has moved and the estimator is re-learned from that block.
+    """
+    method: str = "mad"
+    k: Optional[float] = None
+    warmup: int = 30
+    max_hold_ms: float = 3000.0
+    max_latency_ms: float = 5000.0
+    stale_press_sec: float = 5.0
+    refresh_every: int = 16
+    shift_reject_rate: float = 0.75
+
+    @property
+    def k_value(self) -> float:
+        if self.k is not None:
+            return self.k
+        return 3.0 if self.method == "iqr" else 3.5
+
+
+class _Fenced:
+    """
+    An estimator plus a cached acceptance fence, refreshed every few samples, and
+    the current block of samples with its rejection count for shift detection.
+    """
+    __slots__ = ("est", "fence", "since", "block", "rejects")
+
+    def __init__(self):
+        self.est = RobustEstimator()
+        self.fence: Optional[Tuple[float, float]] = None
+        self.since = 0
+        self.block = LogHistogram()
+        self.rejects = 0
+
+
+class OutlierRejector:
+    """
+    Streaming outlier rejection for holds (per key, falling back to all keys while
+    a key warms up; both fences) and latencies (upper fence). Every sample under the
+    hard caps trains the estimators: scattered artifacts barely move a median/MAD,
+    while a key that is genuinely held longer gets its own fence. A sustained shift
+    re-learns the fence (see `RejectionPolicy`). Rejections are counted by reason.
+    """
+
+    def __init__(self, policy: Optional[RejectionPolicy] = None):
+        self.policy = policy or RejectionPolicy()
+        self.rejected: Dict[str, int] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self._holds: Dict[int, _Fenced] = {}
+        self._all_holds = _Fenced()
+        self._latency = _Fenced()
+        self.rejected = {}
+
+    def count(self, reason: str, n: int = 1) -> None:
+        self.rejected[reason] = self.rejected.get(reason, 0) + n
+
+    def _fence(self, f: _Fenced) -> Optional[Tuple[float, float]]:
+        p = self.policy
+        if p.method == "none" or f.est.count < p.warmup:
+            return None
+        if f.fence is None or f.since >= p.refresh_every:
+            f.fence = f.est.log_fence(p.method, p.k_value)
+            f.since = 0
+        return f.fence
+
+    def _learn(self, f: _Fenced, x: float, rejected: bool) -> None:
+        f.est.add(x)
+        f.since += 1
+        f.block.add(x)
+        f.rejects += rejected
+        p = self.policy
+        if f.block.count >= p.refresh_every:
+            if f.rejects > p.shift_reject_rate * f.block.count:
+                # Nearly everything falls outside the fence: follow the new distribution
+                f.est = RobustEstimator(f.block)
+                f.fence = None
+            f.block = LogHistogram()
+            f.rejects = 0
+
+    def accept_hold(self, vk: int, hold_ms: float) -> bool:
+        if hold_ms > self.policy.max_hold_ms:
+            self.count("hold_cap")
+            return False
+        key = self._holds.get(vk)
+        if key is None:
+            key = self._holds[vk] = _Fenced()
+        # A rejection counts towards a shift only for the estimator whose fence made it
+        judge = key if self._fence(key) is not None else self._all_holds
+        fence = self._fence(judge)
+        rejected = fence is not None and not fence[0] <= hold_ms <= fence[1]
+        self._learn(key, hold_ms, rejected and judge is key)
+        self._learn(self._all_holds, hold_ms, rejected and judge is self._all_holds)
+        if rejected:
+            self.count("hold_outlier")
+        return not rejected
+
+    def accept_latency(self, latency_ms: float) -> bool:
+        if latency_ms > self.policy.max_latency_ms:
+            self.count("latency_cap")
+            return False
+        # Upper fence only: very short gaps are genuine rollover, long ones are the artifacts
+        fence = self._fence(self._latency)
+        rejected = fence is not None and latency_ms > fence[1]
+        self._learn(self._latency, latency_ms, rejected)
+        if rejected:
+            self.count("latency_outlier")
+        return not rejected
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from .analytics import Metrics
+from .robust import LogHistogram
+
+
+@dataclass
+class Segment:
+    """
+    One uninterrupted stretch of recording (start/resume until pause/stop).
+    Offsets index the EventStore columns; aggregates are maintained per event.
+    """
+    index: int
+    start_ts: float
+    press_start: int
+    hold_start: int
+    latency_start: int
+    end_ts: Optional[float] = None
+    press_end: Optional[int] = None
+    hold_end: Optional[int] = None
+    latency_end: Optional[int] = None
+    presses: int = 0
+    bursts: int = 0
+    last_press_ms: Optional[float] = None
+    holds: LogHistogram = field(default_factory=LogHistogram)
+    latencies: LogHistogram = field(default_factory=LogHistogram)
+    per_key: Dict[int, LogHistogram] = field(default_factory=dict)
+
+    @property
+    def open(self) -> bool:
+        return self.end_ts is None
+
+    def duration_secs(self, now: Optional[float] = None) -> float:
+        end = self.end_ts if self.end_ts is not None else now
+        return max((end or self.start_ts) - self.start_ts, 0.0)
+
+    def on_press(self, ts_ms: float, burst_threshold_ms: float) -> None:
+        if self.last_press_ms is None or ts_ms - self.last_press_ms >= burst_threshold_ms:
+            self.bursts += 1
+        self.last_press_ms = ts_ms
+        self.presses += 1
+
+    def on_hold(self, vk: int, hold_ms: float) -> None:
+        self.holds.add(hold_ms)
+        h = self.per_key.get(vk)
+        if h is None:
+            h = self.per_key[vk] = LogHistogram()
+        h.add(hold_ms)
+
+    def on_latency(self, latency_ms: float) -> None:
+        self.latencies.add(latency_ms)
+
+
+def segment_metrics(segments: Iterable[Segment], session_id: str, started_at: str,
+                    now: Optional[float] = None) -> Metrics:
+    """
+    Metrics for a range of segments from their aggregates alone: cost is
+    O(segments x occupied bins), independent of the number of events.
+    Medians/p95s are histogram approximations.
+    """
+    holds, lats = LogHistogram(), LogHistogram()
+    per_key: Dict[int, LogHistogram] = {}
+    presses = bursts = 0
+    duration = 0.0
+    for seg in segments:
+        holds.merge(seg.holds)
+        lats.merge(seg.latencies)
+        for vk, h in seg.per_key.items():
+            per_key.setdefault(vk, LogHistogram()).merge(h)
+        presses += seg.presses
+        bursts += seg.bursts
+        duration += seg.duration_secs(now)
+    return Metrics(
+        session_id=session_id,
+        started_at=started_at,
+        duration_secs=int(duration),
+        events=presses,
+        holds_count=holds.count,
+        latency_count=lats.count,
+        median_hold_ms=holds.quantile(0.5),
+        median_latency_ms=lats.quantile(0.5),
+        p95_latency_ms=lats.quantile(0.95),
+        bursts=bursts,
+        avg_burst_len=presses / bursts if bursts else 0.0,
+        per_key=[{"code": int(vk), "count": h.count, "median_hold": h.quantile(0.5), "p95_hold": h.quantile(0.95)}
+                 for vk, h in sorted(per_key.items())],
+    )
+
+
+def segment_breakdown(segments: Iterable[Segment], now: Optional[float] = None) -> List[Dict]:
+    """Per-segment summary rows for reports."""
+    return [{
+        "index": seg.index,
+        "press_offset": seg.press_start,
+        "duration_secs": round(seg.duration_secs(now), 3),
+        "events": seg.presses,
+        "holds": seg.holds.count,
+        "median_hold_ms": seg.holds.quantile(0.5),
+        "median_latency_ms": seg.latencies.quantile(0.5),
+        "bursts": seg.bursts,
+    } for seg in segments]
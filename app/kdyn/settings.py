@@ -16,6 +16,12 @@ class NotificationPrefs:
     telegram_token: str = ""
     telegram_chat_id: str = ""
 
+@dataclass
+class ExportPrefs:
+    # Both write the ordered VK stream, from which typed text can be rebuilt; off by default
+    timeseries_ndjson: bool = False
+    arrow_format: str = "none"  # "none", "ipc", "parquet" (needs pyarrow)
+
 @dataclass
 class UISettings:
     theme: str = "light"  # "light", "dark", "high_contrast"
@@ -25,6 +31,13 @@ class SessionDefaults:
     session_name: str = "default"
     max_duration_sec: int = 120
     idle_timeout_sec: int = 10
+    memory_budget_mb: int = 32
+    collapse_autorepeat: bool = True
+    burst_mode: str = "fixed"  # "fixed" or "adaptive"
+    burst_threshold_ms: float = 700.0
+    exclude_modifiers: bool = False
+    outlier_method: str = "mad"  # "mad", "iqr" or "none" (hard caps still apply)
+    stale_press_sec: float = 5.0
 
 @dataclass
 class AppSettings:
@@ -32,6 +45,7 @@ class AppSettings:
     notifications: NotificationPrefs = field(default_factory=NotificationPrefs)
     ui: UISettings = field(default_factory=UISettings)
     session: SessionDefaults = field(default_factory=SessionDefaults)
+    export: ExportPrefs = field(default_factory=ExportPrefs)
 
     @staticmethod
     def load() -> "AppSettings":
@@ -57,6 +71,18 @@ class AppSettings:
                     session_name=str(sess.get("session_name", s.session.session_name)),
                     max_duration_sec=int(sess.get("max_duration_sec", s.session.max_duration_sec)),
                     idle_timeout_sec=int(sess.get("idle_timeout_sec", s.session.idle_timeout_sec)),
+                    memory_budget_mb=int(sess.get("memory_budget_mb", s.session.memory_budget_mb)),
+                    collapse_autorepeat=bool(sess.get("collapse_autorepeat", s.session.collapse_autorepeat)),
+                    exclude_modifiers=bool(sess.get("exclude_modifiers", s.session.exclude_modifiers)),
+                    burst_mode=str(sess.get("burst_mode", s.session.burst_mode)),
+                    burst_threshold_ms=float(sess.get("burst_threshold_ms", s.session.burst_threshold_ms)),
+                    outlier_method=str(sess.get("outlier_method", s.session.outlier_method)),
+                    stale_press_sec=float(sess.get("stale_press_sec", s.session.stale_press_sec)),
+                )
+                ex = data.get("export", {})
+                s.export = ExportPrefs(
+                    timeseries_ndjson=bool(ex.get("timeseries_ndjson", s.export.timeseries_ndjson)),
+                    arrow_format=str(ex.get("arrow_format", s.export.arrow_format)),
                 )
                 return s
             except Exception:
@@ -0,0 +1,448 @@
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from array import array
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .analytics import HoldEvent, LatencyEvent, LiveBurstExtractor, Metrics, RobustStatsExtractor
+from .bursts import BurstIndex, DEFAULT_THRESHOLD_MS
+from .extractors import ExtractorEngine
+from .segments import Segment, segment_breakdown, segment_metrics
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+CHUNK_ITEMS = 64 * 1024
+SPILL_PREFIX = "kdyn-spill-"
+_OWNER_FILE = ".owner"
+_PAD_BLOCK = 4096
+
+
+def _try_lock(f) -> bool:
+    """Non-blocking exclusive lock on an open file; released when the file is closed."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def remove_stale_spill_dirs(root: Optional[Path] = None, min_age_s: float = 60.0) -> int:
+    """
+    Delete spill dirs left behind by a run that crashed. A live store holds the lock
+    on its dir's owner file, so only dirs nobody owns are removed. Returns the count.
+    """
+    removed = 0
+    for d in Path(root or tempfile.gettempdir()).glob(SPILL_PREFIX + "*"):
+        try:
+            if not d.is_dir() or time.time() - d.stat().st_mtime < min_age_s:
+                continue
+            with open(d / _OWNER_FILE, "a+b") as f:
+                if not _try_lock(f):
+                    continue
+        except OSError:
+            continue
+        shutil.rmtree(d, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def _mask(data: bytes, key: bytes, offset: int) -> bytes:
+    """XOR `data` with the key's SHAKE-256 keystream at byte `offset`; its own inverse."""
+    if not data:
+        return data
+    first, last = offset // _PAD_BLOCK, (offset + len(data) - 1) // _PAD_BLOCK
+    pad = b"".join(hashlib.shake_256(key + b.to_bytes(8, "little")).digest(_PAD_BLOCK)
+                   for b in range(first, last + 1))
+    skip = offset - first * _PAD_BLOCK
+    pad = pad[skip:skip + len(data)]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(pad, "little")).to_bytes(len(data), "little")
+
+
+class ColumnStats:
+    """Exact running aggregates; unaffected by spilling."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self.total += x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Column:
+    """
+    Append-only typed column. The newest values live in an in-memory array; older
+    values are spilled to `<spill_dir>/<name>.seg` as raw machine values and read back
+    by absolute index, so readers never see a gap or a duplicate across a spill.
+    `masked` columns (the VK codes) are XORed with a keystream whose key exists only
+    in memory, so a spill file outliving its process does not give away key order.
+    """
+
+    def __init__(self, name: str, typecode: str, store: "EventStore", masked: bool = False):
+        self.name = name
+        self.typecode = typecode
+        self.masked = masked
+        self._store = store
+        self._mem = array(typecode)
+        self.spilled = 0
+        self.stats = ColumnStats()
+
+    @property
+    def itemsize(self) -> int:
+        return self._mem.itemsize
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mem) * self._mem.itemsize
+
+    @property
+    def in_memory(self) -> array:
+        """The unspilled tail; read-only use, callers must hold the store lock."""
+        return self._mem
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._mem)
+
+    def _append(self, x) -> None:
+        self._mem.append(x)
+        self.stats.add(x)
+
+    def _spill_file(self) -> Path:
+        return self._store._spill_path() / f"{self.name}.seg"
+
+    def _spill(self, n: int) -> None:
+        if n <= 0:
+            return
+        with open(self._spill_file(), "ab") as f, memoryview(self._mem) as mv:
+            if self.masked:
+                f.write(_mask(mv[:n].tobytes(), self._store._spill_key, self.spilled * self.itemsize))
+            else:
+                f.write(mv[:n])
+        del self._mem[:n]
+        self.spilled += n
+
+    def _read_spilled(self, start: int, stop: int) -> array:
+        out = array(self.typecode)
+        with open(self._spill_file(), "rb") as f:
+            f.seek(start * out.itemsize)
+            if self.masked:
+                out.frombytes(_mask(f.read((stop - start) * out.itemsize), self._store._spill_key,
+                                    start * out.itemsize))
+            else:
+                out.fromfile(f, stop - start)
+        return out
+
+    def read(self, start: int, stop: int, epoch: Optional[int] = None) -> array:
+        """
+        Values [start, stop) by absolute index, from disk and/or memory. A read
+        racing a clear(), or made for an `epoch` that a clear() has since ended,
+        returns no values rather than touching the new contents.
+        """
+        if start >= stop:
+            return array(self.typecode)
+        store = self._store
+        with store._lock:
+            if epoch is None:
+                epoch = store._epoch
+            elif epoch != store._epoch:
+                return array(self.typecode)
+            spilled = self.spilled
+            if start >= spilled:
+                return self._mem[start - spilled:stop - spilled]
+            tail = self._mem[:max(stop - spilled, 0)]
+        # Appends keep going under the store lock; only clear() waits for the file read
+        with store._io_lock:
+            if store._epoch != epoch:
+                return array(self.typecode)
+            head = self._read_spilled(start, min(stop, spilled))
+        head.extend(tail)
+        return head
+
+    def iter_chunks(self, chunk: int = CHUNK_ITEMS, start: int = 0, stop: Optional[int] = None,
+                    epoch: Optional[int] = None) -> Iterator[array]:
+        """
+        Bounded-size chunks over a snapshot of [start, stop); safe while recording.
+        The snapshot is taken on call, and the iterator ends early if the store is
+        cleared, so it never runs on into the next session's values.
+        """
+        with self._store._lock:
+            stop = len(self) if stop is None else stop
+            epoch = self._store._epoch if epoch is None else epoch
+
+        def chunks() -> Iterator[array]:
+            for i in range(start, stop, chunk):
+                out = self.read(i, min(i + chunk, stop), epoch)
+                if not out:
+                    return
+                yield out
+        return chunks()
+
+    def __iter__(self):
+        for c in self.iter_chunks():
+            yield from c
+
+    def tail(self, n: int) -> List[float]:
+        end = len(self)
+        return list(self.read(max(end - n, 0), end))
+
+    def _clear(self) -> None:
+        del self._mem[:]
+        self.spilled = 0
+        self.stats = ColumnStats()
+
+
+class EventStore:
+    """
+    Columnar, memory-budgeted store for timing events.
+
+    Appends go to typed arrays; once their combined size exceeds `memory_budget_bytes`
+    the oldest half of every column is spilled to disk. Running aggregates in
+    `Column.stats` stay exact and the iterators stream spilled values back transparently.
+
+    Events are also grouped into activity segments (begin_segment/end_segment) whose
+    offsets and running aggregates allow per-segment metrics without touching events,
+    and pushed into a bounded incremental ExtractorEngine (`live`) for live KPIs.
+    """
+
+    def __init__(self, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET, spill_dir: Optional[Path] = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._own_spill_dir: Optional[Path] = None
+        self._lock = threading.Lock()
+        # Held while spill files are read or deleted; taken before _lock, never inside it
+        self._io_lock = threading.Lock()
+        self._epoch = 0  # bumped by clear() so in-flight reads can tell their snapshot is gone
+        self._spill_key = os.urandom(32)  # never written out; replaced on clear()
+        self._owner = None  # open, locked owner file of our own spill dir
+        self._nbytes = 0
+
+        self.press_ts_ms = Column("press_ts_ms", "d", self)
+        self.press_vk = Column("press_vk", "i", self, masked=True)
+        self.hold_vk = Column("hold_vk", "i", self, masked=True)
+        self.hold_ms = Column("hold_ms", "d", self)
+        self.latency_ms = Column("latency_ms", "d", self)
+        self.columns = [self.press_ts_ms, self.press_vk, self.hold_vk, self.hold_ms, self.latency_ms]
+        # Columns per series, in extractors.SERIES order
+        self.series: Dict[str, List[Column]] = {
+            "press": [self.press_vk, self.press_ts_ms],
+            "hold": [self.hold_vk, self.hold_ms],
+            "latency": [self.latency_ms],
+        }
+
+        self.burst_threshold_ms = DEFAULT_THRESHOLD_MS
+        self.segments: List[Segment] = []
+        self._segment: Optional[Segment] = None
+
+        self._live_bursts = LiveBurstExtractor()
+        self.live = ExtractorEngine([self._live_bursts, RobustStatsExtractor()])
+
+    def _spill_path(self) -> Path:
+        if self._spill_dir is not None:
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+            return self._spill_dir
+        if self._own_spill_dir is None:
+            self._own_spill_dir = Path(tempfile.mkdtemp(prefix=SPILL_PREFIX))
+            self._owner = open(self._own_spill_dir / _OWNER_FILE, "a+b")
+            _try_lock(self._owner)
+        return self._own_spill_dir
+
+    @property
+    def epoch(self) -> int:
+        """Bumped by every clear(); pass to `Column.iter_chunks` to keep columns on one snapshot."""
+        with self._lock:
+            return self._epoch
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def spilled(self) -> bool:
+        return any(c.spilled for c in self.columns)
+
+    def _appended(self, nbytes: int) -> None:
+        self._nbytes += nbytes
+        if self.memory_budget_bytes > 0 and self._nbytes > self.memory_budget_bytes:
+            for c in self.columns:
+                c._spill(len(c._mem) // 2)
+            self._nbytes = sum(c.nbytes for c in self.columns)
+
+    def add_press(self, vk: int, ts_ms: float) -> None:
+        with self._lock:
+            self.press_ts_ms._append(ts_ms)
+            self.press_vk._append(vk)
+            if self._segment is not None:
+                self._segment.on_press(ts_ms, self.burst_threshold_ms)
+            self.live.push_press(vk, ts_ms)
+            self._appended(self.press_ts_ms.itemsize + self.press_vk.itemsize)
+
+    def add_hold(self, vk: int, hold_ms: float) -> None:
+        with self._lock:
+            self.hold_vk._append(vk)
+            self.hold_ms._append(hold_ms)
+            if self._segment is not None:
+                self._segment.on_hold(vk, hold_ms)
+            self.live.push_hold(vk, hold_ms)
+            self._appended(self.hold_vk.itemsize + self.hold_ms.itemsize)
+
+    def add_latency(self, latency_ms: float) -> None:
+        with self._lock:
+            self.latency_ms._append(latency_ms)
+            if self._segment is not None:
+                self._segment.on_latency(latency_ms)
+            self.live.push_latency(latency_ms)
+            self._appended(self.latency_ms.itemsize)
+
+    # Activity segments
+
+    def begin_segment(self, ts: float) -> None:
+        """Open a segment at the current column offsets (no-op if one is open)."""
+        with self._lock:
+            if self._segment is not None:
+                return
+            self._segment = Segment(index=len(self.segments), start_ts=ts, press_start=len(self.press_ts_ms),
+                                    hold_start=len(self.hold_ms), latency_start=len(self.latency_ms))
+            self.segments.append(self._segment)
+
+    def end_segment(self, ts: float) -> None:
+        with self._lock:
+            seg = self._segment
+            if seg is None:
+                return
+            seg.end_ts = ts
+            seg.press_end, seg.hold_end, seg.latency_end = len(self.press_ts_ms), len(self.hold_ms), len(self.latency_ms)
+            self._segment = None
+
+    def segment_metrics(self, session_id: str, started_at: str, first: int = 0,
+                        last: Optional[int] = None, now: Optional[float] = None) -> Metrics:
+        """Metrics for segments[first:last] in O(segments); see segments.segment_metrics."""
+        with self._lock:
+            return segment_metrics(self.segments[first:last], session_id, started_at, now=now)
+
+    def live_metrics(self, session_id: str, started_at: str, burst_mode: str = "fixed",
+                     burst_threshold_ms: Optional[float] = None, now: Optional[float] = None) -> Metrics:
+        """
+        KPI snapshot that never reads events back: medians/p95s/per-key holds from
+        the segment aggregates, bursts and robust summaries from the `live` engine,
+        counts from the running column stats. Cost is O(segments x bins); values
+        are histogram approximations, the exact figures come from a full pass.
+        """
+        with self._lock:
+            m = segment_metrics(self.segments, session_id, started_at, now=now)
+            self._live_bursts.mode = burst_mode
+            self._live_bursts.threshold_ms = self.burst_threshold_ms if burst_threshold_ms is None else burst_threshold_ms
+            r = self.live.results()
+            m.events = self.press_ts_ms.stats.count
+            m.holds_count = self.hold_ms.stats.count
+            m.latency_count = self.latency_ms.stats.count
+        bursts = r["bursts"]
+        m.bursts, m.avg_burst_len, m.burst_threshold_ms = bursts["bursts"], bursts["avg_len"], bursts["threshold_ms"]
+        m.robust = r["robust"]
+        return m
+
+    def segment_breakdown(self, now: Optional[float] = None,
+                          burst_threshold_ms: Optional[float] = None) -> List[Dict]:
+        """
+        Per-segment rows. Bursts come from the live per-segment counts, which use
+        `self.burst_threshold_ms`; for any other threshold (e.g. the adaptive one)
+        each segment's presses are re-read and re-counted so the table matches the
+        headline burst KPI.
+        """
+        with self._lock:
+            segs = list(self.segments)
+            rows = segment_breakdown(segs, now=now)
+            live = self.burst_threshold_ms
+            stops = [seg.press_end if seg.press_end is not None else len(self.press_ts_ms) for seg in segs]
+            epoch = self._epoch
+        thr = live if burst_threshold_ms is None else float(burst_threshold_ms)
+        for row, seg, stop in zip(rows, segs, stops):
+            if thr != live:
+                stamps = chain.from_iterable(self.press_ts_ms.iter_chunks(start=seg.press_start, stop=stop,
+                                                                          epoch=epoch))
+                row["bursts"] = BurstIndex(stamps).count(thr)
+            row["burst_threshold_ms"] = thr
+        return rows
+
+    def snapshot(self) -> Tuple[Segment, int]:
+        """
+        A closed segment spanning every event recorded so far, and the epoch it
+        belongs to; pass both to `series_chunks` to read exactly those events.
+        """
+        with self._lock:
+            seg = Segment(index=-1, start_ts=0.0, press_start=0, hold_start=0, latency_start=0,
+                          end_ts=0.0, press_end=len(self.press_ts_ms), hold_end=len(self.hold_ms),
+                          latency_end=len(self.latency_ms))
+            return seg, self._epoch
+
+    def series_chunks(self, chunk: int = CHUNK_ITEMS, segment: Optional[Segment] = None,
+                      epoch: Optional[int] = None) -> Dict[str, Iterator[Tuple[array, ...]]]:
+        """
+        Aligned column chunks per series in extractors.SERIES layout, optionally
+        limited to one activity segment's offsets.
+        """
+        epoch = self.epoch if epoch is None else epoch
+
+        def aligned(cols: List[Column], start: int, stop: Optional[int]) -> Iterator[Tuple[array, ...]]:
+            stop = min(len(c) for c in cols) if stop is None else stop
+            return zip(*(c.iter_chunks(chunk, start=start, stop=stop, epoch=epoch) for c in cols))
+        seg = segment
+        return {
+            "press": aligned(self.series["press"], seg.press_start if seg else 0, seg.press_end if seg else None),
+            "hold": aligned(self.series["hold"], seg.hold_start if seg else 0, seg.hold_end if seg else None),
+            "latency": aligned(self.series["latency"], seg.latency_start if seg else 0, seg.latency_end if seg else None),
+        }
+
+    def iter_holds(self) -> Iterator[HoldEvent]:
+        with self._lock:
+            stop, epoch = len(self.hold_ms), self._epoch
+        for codes, vals in zip(self.hold_vk.iter_chunks(stop=stop, epoch=epoch),
+                               self.hold_ms.iter_chunks(stop=stop, epoch=epoch)):
+            for code, v in zip(codes, vals):
+                yield HoldEvent(code=code, hold_ms=v)
+
+    def iter_latencies(self) -> Iterator[LatencyEvent]:
+        for v in self.latency_ms:
+            yield LatencyEvent(latency_ms=v)
+
+    def clear(self) -> None:
+        with self._io_lock, self._lock:
+            self._epoch += 1
+            for c in self.columns:
+                c._clear()
+            self._nbytes = 0
+            self.segments = []
+            self._segment = None
+            self.live.reset()
+            self._spill_key = os.urandom(32)
+            if self._owner is not None:
+                self._owner.close()
+                self._owner = None
+            if self._own_spill_dir is not None:
+                shutil.rmtree(self._own_spill_dir, ignore_errors=True)
+                self._own_spill_dir = None
+            elif self._spill_dir is not None:
+                for c in self.columns:
+                    c._spill_file().unlink(missing_ok=True)
+
+    close = clear
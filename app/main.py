@@ -3,11 +3,13 @@ import sys
 from PySide6 import QtWidgets
 from kdyn.logging_conf import configure_logging
 from kdyn.settings import AppSettings
+from kdyn.store import remove_stale_spill_dirs
 from kdyn.gui import MainWindow
 
 
 def main() -> int:
     configure_logging()
+    remove_stale_spill_dirs()
     app = QtWidgets.QApplication(sys.argv)
     app.setApplicationName("KDyn")
     settings = AppSettings.load()
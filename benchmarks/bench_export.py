@@ -0,0 +1,49 @@
+"""Time-series export throughput and memory overhead (default: 10M presses + holds + latencies).
+
+usage: python benchmarks/bench_export.py [events]
+"""
+from __future__ import annotations
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.export import HAVE_ARROW, export_arrow, export_ndjson  # noqa: E402
+from kdyn.store import EventStore  # noqa: E402
+
+
+def main(events: int = 10_000_000) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        store = EventStore(memory_budget_bytes=64 * 1024 * 1024, spill_dir=root / "spill")
+        t0 = time.perf_counter()
+        for i in range(events):
+            store.add_press(65 + i % 26, i * 120.0)
+            store.add_hold(65 + i % 26, 80.0 + i % 40)
+            store.add_latency(60.0 + i % 90)
+        print(f"filled {events:,} events x 3 series in {time.perf_counter() - t0:.1f}s (spilled={store.spilled})")
+
+        runs = [("ndjson", lambda: [export_ndjson(store, root / "out.ndjson")])]
+        if HAVE_ARROW:
+            runs += [("arrow-ipc", lambda: export_arrow(store, root / "out", fmt="ipc")),
+                     ("parquet", lambda: export_arrow(store, root / "out", fmt="parquet"))]
+        for label, run in runs:
+            t0 = time.perf_counter()
+            paths = run()
+            dt = time.perf_counter() - t0
+            size = sum(p.stat().st_size for p in paths)
+            # Second run under tracemalloc (which slows allocation) only to measure overhead
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:10s} {3 * events / dt:>12,.0f} rows/s  {size / dt / 1e6:7.1f} MB/s  "
+                  f"peak Python alloc {peak / 1e6:.1f} MB")
+        store.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
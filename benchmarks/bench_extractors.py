@@ -0,0 +1,65 @@
+"""Fused extractor engine: passes and time as custom extractors are added."""
+from __future__ import annotations
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.analytics import (BurstExtractor, HoldStatsExtractor,  # noqa: E402
+                            LatencyStatsExtractor)
+from kdyn.extractors import Extractor, ExtractorEngine  # noqa: E402
+from kdyn.store import EventStore  # noqa: E402
+
+
+class SumLatency(Extractor):
+    series = ("latency",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def init(self):
+        return 0.0
+
+    def update(self, state, series, cols):
+        return state + sum(cols[0])
+
+    def merge(self, a, b):
+        return a + b
+
+
+class MaxHold(Extractor):
+    series = ("hold",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def init(self):
+        return 0.0
+
+    def update(self, state, series, cols):
+        return max(state, max(cols[1], default=0.0))
+
+    def merge(self, a, b):
+        return max(a, b)
+
+
+def main(events: int = 1_000_000) -> None:
+    store = EventStore()
+    for i in range(events):
+        store.add_press(65 + i % 26, i * 150.0 + (i % 9) * 40)
+        store.add_hold(65 + i % 26, 70.0 + i % 60)
+        store.add_latency(90.0 + i % 120)
+    builtins = lambda: [HoldStatsExtractor(), LatencyStatsExtractor(), BurstExtractor()]  # noqa: E731
+    for k in (0, 2, 4, 8, 16):
+        custom = [(SumLatency if j % 2 else MaxHold)(f"x{j}") for j in range(k)]
+        engine = ExtractorEngine(builtins() + custom)
+        t0 = time.perf_counter()
+        engine.run(store.series_chunks())
+        dt = time.perf_counter() - t0
+        print(f"{3 + k:2d} extractors: {engine.passes} passes, {dt * 1000:7.1f} ms "
+              f"({3 * events / dt:,.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,46 @@
+"""Filter-chain throughput on a synthetic stream with autorepeat runs and modifiers."""
+from __future__ import annotations
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.filters import MODIFIER_VKS, build_chain  # noqa: E402
+
+
+def make_stream(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    keys = list(range(65, 91)) + sorted(MODIFIER_VKS)
+    out = []
+    t = 0.0
+    while len(out) < n:
+        vk = rng.choice(keys)
+        repeats = rng.choice([1, 1, 1, 1, 8])  # occasional held key with autorepeat
+        for _ in range(repeats):
+            t += 0.03
+            out.append((True, vk, t))
+        t += 0.08
+        out.append((False, vk, t))
+    return out
+
+
+def main(n: int = 1_000_000) -> None:
+    stream = make_stream(n)
+    for label, chain in [
+        ("autorepeat+rollover", build_chain()),
+        ("autorepeat+modifiers+rollover", build_chain(exclude_modifiers=True)),
+    ]:
+        t0 = time.perf_counter()
+        for is_press, vk, t in stream:
+            if is_press:
+                chain.on_press(vk, t)
+            else:
+                chain.on_release(vk, t)
+        dt = time.perf_counter() - t0
+        print(f"{label:32s} {len(stream) / dt:,.0f} events/s  drops={chain.drops()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""History index responsiveness at 50k sessions: sorted page fetches and LRU metric loads."""
+from __future__ import annotations
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.analytics import Metrics  # noqa: E402
+from kdyn.history import COLUMNS, MetricsCache, SessionIndex  # noqa: E402
+
+
+def main(sessions: int = 50_000, page: int = 256) -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        idx = SessionIndex(root / "index.sqlite")
+        items = []
+        for i in range(sessions):
+            m = Metrics(session_id=f"s{i:06d}", started_at=f"2025-01-01T00:00:{i % 60:02d}.{i:06d}",
+                        duration_secs=rng.randint(10, 3600), events=rng.randint(10, 50_000),
+                        holds_count=0, latency_count=0, median_hold_ms=rng.uniform(60, 140),
+                        median_latency_ms=rng.uniform(80, 300), p95_latency_ms=0.0, bursts=rng.randint(0, 500),
+                        avg_burst_len=0.0, per_key=[])
+            p = root / f"{m.session_id}.json"
+            if i < 1000:  # a sample of real files for cache loads
+                p.write_text(json.dumps(asdict(m)), encoding="utf-8")
+            items.append((m, p))
+        t0 = time.perf_counter()
+        idx.upsert_many(items)
+        print(f"indexed {sessions} sessions in {time.perf_counter() - t0:.2f}s")
+
+        for col, _ in COLUMNS:
+            t0 = time.perf_counter()
+            for off in (0, sessions // 2, sessions - page):
+                idx.page(off, page, sort_column=col)
+            print(f"page by {col:18s} {(time.perf_counter() - t0) / 3 * 1000:6.2f} ms")
+
+        cache = MetricsCache(idx)
+        ids = [f"s{i:06d}" for i in range(1000)]
+        t0 = time.perf_counter()
+        for sid in ids:
+            cache.get(sid)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for sid in ids[-200:]:
+            cache.get(sid)
+        warm = time.perf_counter() - t0
+        print(f"metrics load cold {cold / 1000 * 1e6:.0f} us, warm {warm / 200 * 1e6:.1f} us")
+        idx.close()
+
+
+if __name__ == "__main__":
+    main()
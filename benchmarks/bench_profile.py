@@ -0,0 +1,45 @@
+"""Profile-matching throughput: events scored per second across many enrolled profiles."""
+from __future__ import annotations
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.profile import Profile, ProfileMatcher  # noqa: E402
+
+KEYS = list(range(48, 91))
+
+
+def _feature(rng: random.Random, count: int, mean: tuple, std: tuple):
+    # (count, mean, Welford M2) with M2 = std^2 * (count - 1)
+    return count, rng.uniform(*mean), rng.uniform(*std) ** 2 * (count - 1)
+
+
+def make_profile(rng: random.Random, i: int) -> Profile:
+    holds = {vk: _feature(rng, 50, (70, 130), (10, 30)) for vk in KEYS}
+    digraphs = {(a, b): _feature(rng, 10, (100, 300), (20, 60))
+                for a in KEYS for b in KEYS if rng.random() < 0.3}
+    return Profile(name=f"p{i}", sessions=1, holds=holds, digraphs=digraphs)
+
+
+def main(profiles: int = 200, events: int = 5_000) -> None:
+    rng = random.Random(0)
+    matchers = [ProfileMatcher(make_profile(rng, i)) for i in range(profiles)]
+    stream = [(rng.choice(KEYS), rng.uniform(80, 120)) for _ in range(events)]
+    t = 0.0
+    t0 = time.perf_counter()
+    for vk, hold in stream:
+        t += 180.0
+        for m in matchers:
+            m.on_press(vk, t)
+            m.on_hold(vk, hold)
+    dt = time.perf_counter() - t0
+    scored = profiles * events
+    print(f"{profiles} profiles x {events} events: {scored / dt:,.0f} event-scores/s "
+          f"({dt / scored * 1e9:.0f} ns each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Recorder concurrency stress: injector threads feed synthetic presses/releases through
+the listener callbacks while control threads hammer start/pause/resume/stop/reset
+(and the supervisor may auto-pause). Reports transition latency, which under
+contention is dominated by GIL hand-offs (compare the uncontended baseline), and
+checks that every event is accounted for exactly once.
+"""
+from __future__ import annotations
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from kdyn.filters import FilterChain  # noqa: E402
+from kdyn.recorder import Recorder, RecorderState  # noqa: E402
+from synthetic import SyntheticListener  # noqa: E402
+
+OPS = ("start", "pause", "resume", "toggle", "stop", "reset")
+
+
+class _Key:
+    __slots__ = ("vk",)
+
+    def __init__(self, vk: int):
+        self.vk = vk
+
+
+def _pct(vals: List[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(int(p * len(s)), len(s) - 1)]
+
+
+def check_invariants(rec: Recorder, injected: int) -> List[str]:
+    """Accounting checks after a run; returns a list of violations (empty if clean)."""
+    errors = []
+    c = rec.counters
+    if injected != c["presses"] + c["releases"] + c["ignored"]:
+        errors.append(f"lost/double-dispatched events: injected={injected} counters={c}")
+    if c["presses"] != rec.total_events + c["cleared"]:
+        errors.append(f"presses {c['presses']} != stored {rec.total_events} + cleared {c['cleared']}")
+    stored = len(rec.store.press_ts_ms)
+    if stored != rec.total_events:
+        errors.append(f"store holds {stored} presses, total_events={rec.total_events}")
+    vks = list(rec.store.press_vk)
+    if len(set(vks)) != len(vks):
+        errors.append("a press was stored twice")
+    segs = rec.store.segments
+    if any(s.open for s in segs):
+        errors.append("segment left open after stop")
+    if sum(s.presses for s in segs) != stored:
+        errors.append("presses recorded outside any segment")
+    for a, b in zip(segs, segs[1:]):
+        if a.press_end != b.press_start:
+            errors.append(f"gap between segments {a.index} and {b.index}")
+    return errors
+
+
+def run(duration_sec: float = 2.0, injectors: int = 4, controllers: int = 2, seed: int = 0,
+        idle_timeout_sec: int = 0) -> Dict:
+    listeners: List[SyntheticListener] = []
+
+    def factory(**callbacks):
+        lst = SyntheticListener(**callbacks)
+        listeners.append(lst)
+        return lst
+
+    rec = Recorder(max_duration_sec=0, idle_timeout_sec=idle_timeout_sec, filters=FilterChain([]),
+                   listener_factory=factory)
+    transitions: List[RecorderState] = []
+    rec.add_state_listener(lambda old, new: transitions.append(new))
+    stop_at = time.perf_counter() + duration_sec
+    injected = [0] * injectors
+    latencies: Dict[str, List[float]] = {op: [] for op in OPS}
+    failures: List[BaseException] = []
+
+    def inject(tid: int) -> None:
+        rng = random.Random(seed * 1000 + tid)
+        seq = 0
+        try:
+            while time.perf_counter() < stop_at:
+                if not listeners:
+                    continue
+                # Mostly the live listener, sometimes a stale one from an earlier start
+                lst = listeners[-1] if rng.random() < 0.9 else rng.choice(listeners)
+                key = _Key(tid * 10_000_000 + seq)  # unique per press: double counts are visible
+                seq += 1
+                lst.press(key)
+                lst.release(key)
+                injected[tid] += 2
+        except BaseException as e:  # surfaced in the report
+            failures.append(e)
+
+    def control(cid: int) -> None:
+        rng = random.Random(seed * 1000 + 500 + cid)
+        try:
+            while time.perf_counter() < stop_at:
+                op = rng.choice(OPS)
+                t0 = time.perf_counter()
+                if op == "start":
+                    rec.start("stress")
+                elif op == "toggle":
+                    rec.toggle_pause()
+                else:
+                    getattr(rec, op)()
+                latencies[op].append(time.perf_counter() - t0)
+                time.sleep(rng.random() * 0.002)
+        except BaseException as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=inject, args=(i,)) for i in range(injectors)]
+    threads += [threading.Thread(target=control, args=(i,)) for i in range(controllers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    rec.stop()
+
+    errors = check_invariants(rec, sum(injected)) + [repr(e) for e in failures]
+    return {
+        "injected": sum(injected),
+        "counters": dict(rec.counters),
+        "stored": rec.total_events,
+        "segments": len(rec.store.segments),
+        "transitions": len(transitions),
+        "listeners": len(listeners),
+        "latency_us": {op: {"n": len(v), "p50": _pct(v, 0.5) * 1e6, "p99": _pct(v, 0.99) * 1e6,
+                            "max": max(v, default=0.0) * 1e6} for op, v in latencies.items()},
+        "errors": errors,
+    }
+
+
+def uncontended(cycles: int = 2000) -> Dict[str, float]:
+    """Mean per-transition cost (us) with no competing threads, as a baseline."""
+    rec = Recorder(max_duration_sec=0, idle_timeout_sec=0, listener_factory=SyntheticListener)
+    t0 = time.perf_counter()
+    for _ in range(cycles):
+        rec.start("baseline"); rec.pause(); rec.resume(); rec.stop()
+    dt = time.perf_counter() - t0
+    rec.reset()
+    return {"transition_us": dt / (cycles * 4) * 1e6}
+
+
+def main(duration_sec: float = 5.0) -> None:
+    base = uncontended()
+    print(f"uncontended: {base['transition_us']:.1f} us per transition")
+    r = run(duration_sec)
+    print(f"injected {r['injected']:,} events over {duration_sec:.0f}s; counters={r['counters']}")
+    print(f"stored presses {r['stored']:,} in {r['segments']} segments; "
+          f"{r['transitions']} state changes across {r['listeners']} listeners")
+    for op, s in r["latency_us"].items():
+        print(f"  {op:7s} n={s['n']:6d}  p50={s['p50']:8.1f} us  p99={s['p99']:8.1f} us  max={s['max']:8.1f} us")
+    print("OK" if not r["errors"] else "FAILED:\n  " + "\n  ".join(r["errors"]))
+    if r["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
@@ -0,0 +1,34 @@
+"""Synthetic keyboard input for the benchmarks and tests; not used by the app."""
+from __future__ import annotations
+from typing import Callable, Optional
+
+
+class SyntheticListener:
+    """
+    Stand-in for keyboard.Listener (pass the class as Recorder(listener_factory=...)).
+    press()/release() deliver injected events to the recorder callbacks. Like a late
+    OS hook callback, they are forwarded even after stop(), so the recorder's own
+    gating is what decides whether an event counts.
+    """
+
+    def __init__(self, on_press: Optional[Callable] = None, on_release: Optional[Callable] = None):
+        self.on_press = on_press
+        self.on_release = on_release
+        self.running = False
+
+    def start(self) -> None:
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        pass
+
+    def press(self, key) -> None:
+        if self.on_press is not None:
+            self.on_press(key)
+
+    def release(self, key) -> None:
+        if self.on_release is not None:
+            self.on_release(key)
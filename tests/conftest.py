@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Shared synthetic-input helpers (SyntheticListener) and the stress harness live in benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
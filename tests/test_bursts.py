@@ -0,0 +1,49 @@
+import random
+
+from kdyn.analytics import aggregate
+from kdyn.bursts import BurstIndex
+
+
+def _scan(ts, thr):
+    # Reference: straightforward rescan per threshold
+    lens, cur = [], 1
+    for a, b in zip(ts, ts[1:]):
+        if b - a < thr:
+            cur += 1
+        else:
+            lens.append(cur)
+            cur = 1
+    return lens + [cur] if ts else []
+
+
+def test_index_matches_rescan_for_any_threshold():
+    rng = random.Random(1)
+    ts, t = [], 0.0
+    for _ in range(2000):
+        t += rng.choice([rng.uniform(60, 250), rng.uniform(800, 4000)])
+        ts.append(t)
+    idx = BurstIndex(ts)
+    for thr in [50, 100, 250, 700, 700.0001, 1000, 2500, 5000]:
+        ref = _scan(ts, thr)
+        assert idx.count(thr) == len(ref)
+        assert idx.lengths(thr) == ref
+        assert abs(idx.avg_len(thr) - sum(ref) / len(ref)) < 1e-9
+    assert BurstIndex([]).count(700) == 0 and BurstIndex([]).lengths(700) == []
+    assert BurstIndex([5.0]).lengths(700) == [1]
+
+
+def test_adaptive_threshold_separates_typing_from_pauses():
+    rng = random.Random(2)
+    ts, t = [], 0.0
+    for i in range(600):
+        t += rng.uniform(2500, 6000) if i % 15 == 0 else rng.uniform(90, 220)
+        ts.append(t)
+    idx = BurstIndex(ts)
+    thr = idx.adaptive_threshold()
+    assert 220 < thr < 2500
+    assert idx.count(thr) == 40
+
+    m = aggregate("s", "2025-01-01T00:00:00Z", 1, len(ts), [], [], ts, burst_mode="adaptive")
+    assert m.burst_threshold_ms == thr and m.bursts == 40
+    assert [b["threshold_ms"] for b in m.burst_profile][:3] == [250.0, 500.0, 700.0]
+    assert BurstIndex(ts[:5]).adaptive_threshold() == 700.0
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from kdyn.export import export_arrow, export_ndjson, read_ndjson
+from kdyn.store import EventStore
+
+
+def _store(tmp_path, n=5000):
+    store = EventStore(memory_budget_bytes=16 * 1024, spill_dir=tmp_path / "spill")
+    for i in range(n):
+        store.add_press(65 + i % 3, 1000.0 + i * 10.5)
+        store.add_hold(65 + i % 3, 90.0 + i % 11)
+        if i:
+            store.add_latency(10.5)
+    assert store.spilled
+    return store
+
+
+def test_ndjson_streams_all_series_in_chunks(tmp_path):
+    store = _store(tmp_path)
+    path = export_ndjson(store, tmp_path / "s.events.ndjson", session_id="s", chunk_events=777)
+    header = next(read_ndjson(path))
+    assert header == {"kind": "session", "session_id": "s", "presses": 5000, "holds": 5000, "latencies": 4999}
+    presses = list(read_ndjson(path, "press"))
+    assert len(presses) == 5000
+    assert presses[3] == {"kind": "press", "ts_ms": 1031.5, "vk": 65}
+    holds = list(read_ndjson(path, "hold"))
+    assert [h["hold_ms"] for h in holds] == list(store.hold_ms)
+    assert len(list(read_ndjson(path, "latency"))) == 4999
+
+
+def test_arrow_ipc_and_parquet_match_store(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    store = _store(tmp_path)
+    paths = export_arrow(store, tmp_path / "s.events", fmt="ipc", chunk_events=1000)
+    assert [p.name for p in paths] == ["s.events.press.arrow", "s.events.hold.arrow", "s.events.latency.arrow"]
+    press = pa.ipc.open_file(str(paths[0])).read_all()
+    assert press.column("ts_ms").to_pylist() == list(store.press_ts_ms)
+    assert press.column("vk").to_pylist()[:3] == [65, 66, 67]
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = export_arrow(store, tmp_path / "s.events", fmt="parquet")
+    assert pq.read_table(str(paths[1])).column("hold_ms").to_pylist() == list(store.hold_ms)
+
+
+def test_ndjson_header_matches_body_while_recording(tmp_path):
+    store = _store(tmp_path, n=2000)
+    done = threading.Event()
+
+    def record():
+        i = 0
+        while not done.is_set():
+            store.add_press(65, 50000.0 + i)
+            store.add_hold(65, 90.0)
+            i += 1
+
+    writer = threading.Thread(target=record)
+    writer.start()
+    try:
+        path = export_ndjson(store, tmp_path / "s.events.ndjson", chunk_events=97)
+    finally:
+        done.set()
+        writer.join()
+    header = next(read_ndjson(path))
+    assert header["presses"] == len(list(read_ndjson(path, "press"))) >= 2000
+    assert header["holds"] == len(list(read_ndjson(path, "hold")))
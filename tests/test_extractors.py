@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from kdyn.analytics import HoldEvent, aggregate, aggregate_columns
+from kdyn.extractors import Extractor, ExtractorEngine, register_extractor, unregister_extractor
+from kdyn.store import EventStore
+
+
+class MaxHold(Extractor):
+    name = "max_hold_ms"
+    series = ("hold",)
+
+    def init(self):
+        return 0.0
+
+    def update(self, state, series, cols):
+        return max(state, max(cols[1], default=0.0))
+
+    def merge(self, a, b):
+        return max(a, b)
+
+
+class PressCount(Extractor):
+    name = "presses_by_vk"
+    series = ("press",)
+
+    def init(self):
+        return {}
+
+    def update(self, state, series, cols):
+        for vk in cols[0]:
+            state[vk] = state.get(vk, 0) + 1
+        return state
+
+    def merge(self, a, b):
+        for k, v in b.items():
+            a[k] = a.get(k, 0) + v
+        return a
+
+    def finalize(self, state):
+        return {str(k): v for k, v in sorted(state.items())}
+
+
+def _store():
+    store = EventStore()
+    t = 0.0
+    for seg in range(3):
+        store.begin_segment(t)
+        for i in range(500):
+            t += 150.0 if i % 50 else 2000.0
+            store.add_press(65 + i % 4, t)
+            store.add_hold(65 + i % 4, 80.0 + (i * 7) % 60)
+            store.add_latency(100.0 + i % 13)
+        store.end_segment(t)
+    return store
+
+
+def test_custom_extractor_lands_in_metrics_extras():
+    store = _store()
+    register_extractor(MaxHold)
+    try:
+        m = aggregate_columns("s", "t", 1, 1500, store.series_chunks(chunk=128))
+    finally:
+        unregister_extractor(MaxHold.name)
+    assert m.extras == {"max_hold_ms": 139.0}
+    assert m.holds_count == 1500 and m.bursts == 30
+    assert aggregate_columns("s", "t", 1, 1500, store.series_chunks()).extras == {}
+
+
+def test_registration_rejects_builtin_names_and_missing_merge():
+    with pytest.raises(ValueError, match="reserved"):
+        register_extractor(type("Shadow", (MaxHold,), {"name": "bursts"}))
+
+    class NoMerge(Extractor):
+        name = "no_merge"
+        series = ("hold",)
+
+    with pytest.raises(ValueError, match="merge"):
+        register_extractor(NoMerge)
+    assert aggregate_columns("s", "t", 1, 1500, _store().series_chunks()).extras == {}
+
+
+def test_fused_pass_count_is_independent_of_extractor_count():
+    store = _store()
+    for n in (1, 4, 16):
+        exts = [type(f"X{i}", (MaxHold,), {"name": f"x{i}"})() for i in range(n)]
+        engine = ExtractorEngine(exts + [PressCount()])
+        engine.run(store.series_chunks(chunk=100))
+        assert engine.passes == 2  # hold + press; latency has no subscriber
+    with pytest.raises(ValueError):
+        ExtractorEngine([MaxHold(), MaxHold()])
+
+
+def test_parallel_chunks_and_incremental_match_single_pass():
+    store = _store()
+    engine = ExtractorEngine([MaxHold(), PressCount()])
+    whole = engine.run(store.series_chunks())
+    parts = lambda: [store.series_chunks(segment=s) for s in store.segments]  # noqa: E731
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        assert engine.run_parallel(parts(), executor=ex) == whole
+    assert engine.run_parallel(parts()) == whole
+
+    for vk, ts in zip(store.press_vk, store.press_ts_ms):
+        engine.push_press(vk, ts)
+    for vk, ms in zip(store.hold_vk, store.hold_ms):
+        engine.push_hold(vk, ms)
+    assert engine.results() == whole
+
+
+def test_aggregate_skips_press_vk_extractors_without_codes():
+    holds = [HoldEvent(code=65, hold_ms=90.0)]
+    no_codes = aggregate("s", "t", 0, 3, holds, [], [0.0, 100.0, 200.0], extractors=[PressCount(), MaxHold()])
+    assert no_codes.extras == {"max_hold_ms": 90.0}
+
+    with_codes = aggregate("s", "t", 0, 3, holds, [], [0.0, 100.0, 200.0], press_codes=[65, 66, 65],
+                           extractors=[PressCount(), MaxHold()])
+    assert with_codes.extras["presses_by_vk"] == {"65": 2, "66": 1}
+    with pytest.raises(ValueError):
+        aggregate("s", "t", 0, 3, holds, [], [0.0, 100.0], press_codes=[65])
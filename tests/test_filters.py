@@ -0,0 +1,32 @@
+from kdyn.filters import AutorepeatFilter, FilterChain, ModifierFilter, RolloverTracker, build_chain
+
+
+def test_autorepeat_collapses_to_single_press():
+    chain = build_chain()
+    kept = [chain.on_press(65, t) for t in (0.0, 0.5, 0.53, 0.56)]
+    assert kept == [True, False, False, False]
+    assert chain.on_release(65, 0.6)
+    assert chain.on_press(65, 1.0)
+    assert chain.drops()["autorepeat"] == 3
+
+
+def test_modifiers_excluded_and_rollover_counted():
+    chain = FilterChain([AutorepeatFilter(), ModifierFilter(), RolloverTracker()])
+    assert not chain.on_press(0xA0, 0.0)  # left shift
+    assert chain.on_press(65, 0.1)
+    assert chain.on_press(66, 0.15)  # pressed while 65 still down
+    assert chain.on_release(65, 0.2) and chain.on_release(66, 0.25)
+    assert not chain.on_release(0xA0, 0.3)
+    assert chain.drops()["modifiers"] == 1
+    assert chain.rollovers == 1
+    assert chain.stats()["rollover"]["max_concurrent"] == 2
+
+    chain.reset()
+    assert chain.rollovers == 0 and chain.drops()["modifiers"] == 0
+
+
+def test_clear_held_forgets_keys_released_while_paused():
+    chain = build_chain()
+    chain.on_press(65, 0.0)
+    chain.clear_held()
+    assert chain.on_press(65, 5.0)
@@ -0,0 +1,68 @@
+import json
+from dataclasses import asdict
+
+from kdyn.analytics import aggregate, HoldEvent, LatencyEvent
+from kdyn.history import SessionIndex, MetricsCache, Prefetcher
+
+
+def _report(dir_, sid, started, events):
+    m = aggregate(sid, started, 10, events, [HoldEvent(code=65, hold_ms=100.0)],
+                  [LatencyEvent(latency_ms=50.0)], [0.0, 50.0])
+    p = dir_ / f"{sid}.json"
+    p.write_text(json.dumps(asdict(m)), encoding="utf-8")
+    return m, p
+
+
+def test_index_sync_page_and_sort(tmp_path):
+    for i in range(5):
+        _report(tmp_path, f"s{i}", f"2025-01-0{i + 1}T00:00:00", events=10 * (5 - i))
+    idx = SessionIndex(tmp_path / "index.sqlite")
+    assert idx.sync(tmp_path) == 5
+    assert idx.sync(tmp_path) == 0  # unchanged files are not reopened
+    assert idx.count() == 5
+
+    newest = idx.page(0, 2)
+    assert [r[0] for r in newest] == ["s4", "s3"]
+    by_events = idx.page(0, 5, sort_column="events", descending=False)
+    assert [r[3] for r in by_events] == [10, 20, 30, 40, 50]
+
+    (tmp_path / "s0.json").unlink()
+    idx.sync(tmp_path)
+    assert idx.count() == 4
+    idx.close()
+
+
+def test_metrics_cache_lru_and_prefetch(tmp_path):
+    idx = SessionIndex(tmp_path / "index.sqlite")
+    for i in range(4):
+        m, p = _report(tmp_path, f"s{i}", "2025-01-01T00:00:00", events=i)
+        idx.upsert(m, p)
+    cache = MetricsCache(idx, capacity=2)
+    assert cache.get("s0").events == 0
+    cache.get("s1")
+    cache.get("s0")  # s0 becomes most recent
+    cache.get("s2")  # evicts s1
+    assert "s0" in cache and "s2" in cache and "s1" not in cache
+    assert cache.get("missing") is None
+
+    loaded = []
+    pf = Prefetcher(cache, on_loaded=loaded.append)
+    pf.request(["s3"])
+    pf.join()
+    pf.close()
+    assert loaded == ["s3"] and cache.peek("s3").session_id == "s3"
+    idx.close()
+
+
+def test_write_json_reuses_the_given_index(tmp_path, monkeypatch):
+    from kdyn import reports
+
+    monkeypatch.setattr(reports, "REPORTS_DIR", tmp_path)
+    idx = SessionIndex(tmp_path / "index.sqlite")
+    opened = []
+    monkeypatch.setattr(reports, "SessionIndex", lambda *a: opened.append(a) or idx)
+    for i in range(3):
+        m = aggregate(f"b{i}", "2025-01-01T00:00:00", 10, 1, [], [], [0.0])
+        reports.write_json(m, index=idx)
+    assert opened == [] and idx.count() == 3
+    idx.close()
@@ -1,13 +1,14 @@
 from kdyn.recorder import Recorder
+from synthetic import SyntheticListener
 
 
 def test_recorder_no_plaintext_storage(monkeypatch):
-    r = Recorder()
+    r = Recorder(listener_factory=SyntheticListener)
     # Simulate press/release using fake objects with vk
     class K: pass
     k = K(); k.vk = 65  # 'A' but vk only
 
-    r._running.set(); r._paused.clear()
+    r.start("t")
 
     r._on_press(k)
     r._on_release(k)
@@ -16,4 +17,7 @@ def test_recorder_no_plaintext_storage(monkeypatch):
     assert all(hasattr(h, 'code') and hasattr(h, 'hold_ms') for h in r.holds)
     assert all(hasattr(l, 'latency_ms') for l in r.latencies)
     # No attribute that stores plaintext
-    assert not any(hasattr(h, 'char') for h in r.holds)
\ No newline at end of file
+    assert not any(hasattr(h, 'char') for h in r.holds)
+    r.stop()
+    r._thread.join(timeout=1.0)
+    assert not r._thread.is_alive()
@@ -0,0 +1,71 @@
+from kdyn.analytics import HoldEvent
+from kdyn.profile import Profile, ProfileBuilder, ProfileMatcher, enroll, load_profile, save_profile
+from kdyn.store import EventStore
+
+
+def _session(hold_ms, flight_ms, n=20):
+    codes = [65, 66] * n
+    stamps = [i * flight_ms for i in range(len(codes))]
+    holds = [HoldEvent(code=c, hold_ms=hold_ms + (i % 3)) for i, c in enumerate(codes)]
+    return holds, codes, stamps
+
+
+def test_enroll_and_match_scores_baseline_above_shifted():
+    p = enroll("me", [_session(100.0, 150.0), _session(104.0, 160.0)])
+    assert p.sessions == 2
+    assert set(p.holds) == {65, 66}
+    assert (65, 66) in p.digraphs and (66, 65) in p.digraphs
+
+    same = ProfileMatcher(p)
+    other = ProfileMatcher(p)
+    for m, (holds, codes, stamps) in [(same, _session(102.0, 155.0)), (other, _session(180.0, 400.0))]:
+        for h, c, t in zip(holds, codes, stamps):
+            m.on_press(c, t)
+            m.on_hold(h.code, h.hold_ms)
+    assert same.score is not None and other.score is not None
+    assert same.score > 0.5 > other.score
+
+
+def test_profile_roundtrip_and_extend():
+    p = enroll("me", [_session(100.0, 150.0)])
+    q = Profile.from_dict(p.to_dict())
+    assert q.holds == p.holds and q.digraphs == p.digraphs
+
+    b = ProfileBuilder.from_profile(q)
+    b.add_session(*_session(100.0, 150.0))
+    r = b.build("me")
+    assert r.sessions == 2
+    assert r.holds[65][0] == 2 * p.holds[65][0]
+    assert abs(r.holds[65][1] - p.holds[65][1]) < 1e-9
+
+
+def test_incremental_enrollment_matches_batch(tmp_path):
+    sessions = [_session(100.0 + i, 150.0 + 5 * i, n=1) for i in range(3)]  # 2 presses each
+    batch = enroll("me", sessions)
+
+    profile = None
+    for s in sessions:  # the GUI path: build -> save -> load -> from_profile per enrollment
+        b = ProfileBuilder.from_profile(profile) if profile else ProfileBuilder()
+        b.add_session(*s)
+        save_profile(b.build("me"), tmp_path / "profile.json")
+        profile = load_profile(tmp_path / "profile.json")
+
+    assert profile.sessions == batch.sessions == 3
+    assert set(profile.holds) == set(batch.holds) and set(profile.digraphs) == set(batch.digraphs)
+    for k, (count, mean, m2) in batch.holds.items():
+        assert profile.holds[k][0] == count
+        assert abs(profile.holds[k][1] - mean) < 1e-9 and abs(profile.holds[k][2] - m2) < 1e-6
+    assert ProfileMatcher(profile).features == ProfileMatcher(batch).features == 3
+
+
+def test_enrollment_streams_a_spilled_store(tmp_path):
+    holds, codes, stamps = _session(100.0, 150.0, n=2000)
+    store = EventStore(memory_budget_bytes=4096, spill_dir=tmp_path)
+    for h, c, t in zip(holds, codes, stamps):
+        store.add_press(c, t)
+        store.add_hold(h.code, h.hold_ms)
+    assert store.spilled
+
+    streamed = ProfileBuilder()
+    streamed.add_session(store.iter_holds(), store.press_vk, store.press_ts_ms)
+    assert streamed.build("me") == enroll("me", [(holds, codes, stamps)])
@@ -0,0 +1,96 @@
+import threading
+
+from kdyn.recorder import Recorder, RecorderState
+
+import stress_recorder
+from synthetic import SyntheticListener
+
+
+class K:
+    def __init__(self, vk):
+        self.vk = vk
+
+
+def test_transitions_are_validated_and_signalled():
+    r = Recorder(idle_timeout_sec=0, listener_factory=SyntheticListener)
+    seen = []
+    r.add_state_listener(lambda old, new: seen.append((old.value, new.value)))
+
+    assert r.state is RecorderState.IDLE
+    assert not r.pause() and not r.resume() and not r.stop()
+    assert r.start("t") and not r.start("t")
+    assert r.toggle_pause() is RecorderState.PAUSED
+    assert not r.pause()
+    assert r.toggle_pause() is RecorderState.RECORDING
+    assert r.stop() and r.state is RecorderState.STOPPED
+    assert r.toggle_pause() is None
+    r.reset()
+
+    assert seen == [("idle", "recording"), ("recording", "paused"), ("paused", "recording"),
+                    ("recording", "stopped"), ("stopped", "idle")]
+
+
+def test_events_from_a_stale_listener_are_ignored():
+    r = Recorder(idle_timeout_sec=0, listener_factory=SyntheticListener)
+    r.start("t")
+    old = r.listener
+    old.press(K(65)); old.release(K(65))
+    r.stop()
+    r.start("t")
+    old.press(K(66))          # late callback from the previous start
+    r.listener.press(K(67))
+    r.pause()
+    r.listener.press(K(68))   # paused
+    r.stop()
+
+    assert r.press_codes == [65, 67]
+    assert r.counters == {"presses": 2, "releases": 1, "ignored": 2, "cleared": 0}
+    assert [s.presses for s in r.store.segments] == [1, 1]
+
+
+def test_stress_harness_keeps_accounting_exact():
+    report = stress_recorder.run(duration_sec=0.5, injectors=3, controllers=2, seed=1)
+    assert report["errors"] == []
+    assert report["counters"]["presses"] > 0 and report["transitions"] > 0
+
+
+def test_store_io_runs_outside_the_event_lock():
+    r = Recorder(idle_timeout_sec=0, listener_factory=SyntheticListener)
+    r.start("t")
+    entered, release = threading.Event(), threading.Event()
+    add_press, clear = r.store.add_press, r.store.clear
+
+    def slow(fn):
+        def wrapped(*args):
+            entered.set()
+            release.wait(5)
+            return fn(*args)
+        return wrapped
+
+    # A press blocked in its store append (e.g. spilling) does not hold up other callbacks
+    r.store.add_press = slow(add_press)
+    t = threading.Thread(target=r.listener.press, args=(K(65),))
+    t.start()
+    assert entered.wait(5)
+    r.listener.release(K(66))
+    assert r.counters["releases"] == 1
+    pauser = threading.Thread(target=r.pause)  # but a pause waits for it to land in the segment
+    pauser.start()
+    pauser.join(0.1)
+    assert pauser.is_alive()
+    release.set()
+    t.join(); pauser.join()
+    assert r.state is RecorderState.PAUSED and r.store.segments[0].presses == 1
+
+    # Reset deletes spill files after letting go of the event lock
+    entered.clear(); release.clear()
+    r.store.add_press = add_press
+    r.store.clear = slow(clear)
+    t = threading.Thread(target=r.reset)
+    t.start()
+    assert entered.wait(5)
+    r._on_press(K(67))
+    assert r.counters["ignored"] == 1
+    release.set()
+    t.join()
+    assert r.state is RecorderState.IDLE and r.total_events == 0 and r.counters["cleared"] == 1
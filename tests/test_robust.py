@@ -0,0 +1,130 @@
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from kdyn import recorder
+from kdyn.analytics import aggregate, HoldEvent, LatencyEvent
+from kdyn.recorder import Recorder
+from synthetic import SyntheticListener
+from kdyn.robust import OutlierRejector, RejectionPolicy, RobustEstimator
+
+
+def test_estimator_matches_exact_robust_stats_in_constant_memory():
+    rng = random.Random(5)
+    vals = [rng.lognormvariate(5.0, 0.4) for _ in range(100_000)]
+    est = RobustEstimator()
+    for v in vals:
+        est.add(v)
+    s = sorted(vals)
+    med = statistics.median(s)
+    mad = statistics.median(abs(v - med) for v in s)
+    cut = len(s) // 10
+    trimmed = statistics.fmean(s[cut:len(s) - cut])
+
+    assert abs(est.median() - med) / med < 0.03
+    assert abs(est.mad() - mad) / mad < 0.08
+    assert abs(est.trimmed_mean() - trimmed) / trimmed < 0.03
+    assert len(est.hist.bins) < 200  # bounded by log-range, not by sample count
+
+
+def test_rejector_drops_artifacts_and_keeps_fences_clean():
+    rng = random.Random(9)
+    rej = OutlierRejector(RejectionPolicy(method="mad", warmup=30))
+    kept = []
+    for i in range(2000):
+        v = rng.lognormvariate(5.0, 0.3)
+        if i % 100 == 99:
+            v = 4000.0  # post-idle gap under the hard cap
+        if i % 250 == 249:
+            v = 60_000.0
+        if rej.accept_latency(v):
+            kept.append(v)
+
+    assert rej.rejected["latency_cap"] == 8
+    assert rej.rejected["latency_outlier"] >= 12
+    assert max(kept) < 1000.0
+    # Genuine variation survives: only a small share of clean samples is rejected
+    assert len(kept) > 1900
+
+    iqr = OutlierRejector(RejectionPolicy(method="iqr", warmup=30))
+    for _ in range(200):
+        assert iqr.accept_hold(65, rng.uniform(90, 110))
+    assert not iqr.accept_hold(65, 900.0)
+    assert iqr.rejected == {"hold_outlier": 1}
+
+
+def test_rejector_follows_a_distribution_shift():
+    rng = random.Random(3)
+    rej = OutlierRejector(RejectionPolicy(method="mad", warmup=30))
+    for _ in range(200):
+        rej.accept_hold(65, rng.gauss(80, 6))
+        rej.accept_latency(rng.gauss(80, 6))
+    holds = sum(rej.accept_hold(65, rng.gauss(200, 15)) for _ in range(500))
+    latencies = sum(rej.accept_latency(rng.gauss(200, 15)) for _ in range(500))
+    assert holds > 450 and latencies > 450
+    assert not rej.accept_hold(65, 900.0)
+
+    # A key that is genuinely held long gets its own fence after warming up
+    long_key = 0
+    for i in range(3000):
+        if i % 10:
+            rej.accept_hold(65 + i % 26, rng.gauss(90, 10))
+        else:
+            long_key += rej.accept_hold(8, rng.gauss(600, 60))
+    assert long_key > 260
+
+
+def test_recorder_evicts_stale_presses_and_reports_rejections():
+    class K:
+        def __init__(self, vk):
+            self.vk = vk
+
+    r = Recorder(idle_timeout_sec=0, rejection=RejectionPolicy(stale_press_sec=5.0),
+                 listener_factory=SyntheticListener)
+    r.start("t")
+    r._on_press(K(65))
+    assert r.evict_stale_presses(now=r.last_event_ts + 1.0) == 0
+    assert r.evict_stale_presses(now=r.last_event_ts + 6.0) == 1
+    r._on_release(K(65))  # release of an evicted press yields no hold
+    r._on_press(K(65))    # and the key is not treated as autorepeat
+    r._on_press(K(66))
+    r.pause()             # keys still down across a pause are dropped, but are not artifacts
+    r._on_release(K(66))
+    r.stop()
+
+    assert r.total_events == 3
+    assert r.holds == []
+    assert r.rejector.rejected == {"stale_press": 1}
+
+    m = aggregate("s", "t", 0, 2, [HoldEvent(65, 100.0), HoldEvent(66, 120.0)], [LatencyEvent(80.0)], [0.0, 80.0],
+                  rejected=r.rejector.rejected)
+    assert m.rejected == {"stale_press": 1}
+    assert m.robust["hold"]["count"] == 2 and m.robust["latency"]["count"] == 1
+
+
+def test_autorepeat_keeps_a_long_hold_pending(monkeypatch):
+    class K:
+        def __init__(self, vk):
+            self.vk = vk
+
+    clock = [1000.0]
+    monkeypatch.setattr(recorder, "time", SimpleNamespace(time=lambda: clock[0], sleep=time.sleep))
+    r = Recorder(max_duration_sec=0, idle_timeout_sec=0, rejection=RejectionPolicy(stale_press_sec=1.0),
+                 listener_factory=SyntheticListener)
+    r.start("t")
+    r._on_press(K(65))
+    for _ in range(116):  # OS autorepeat every 30 ms: a 3.5 s hold, well past stale_press_sec
+        clock[0] += 0.03
+        r._on_press(K(65))
+        assert r.evict_stale_presses() == 0
+    r._on_release(K(65))
+    clock[0] += 0.2
+    r._on_press(K(17))    # Ctrl of a Ctrl+P pause shortcut, released while paused
+    r.pause()
+    r.stop()
+
+    assert r.total_events == 2 and r.press_codes == [65, 17]
+    assert r.filters.drops()["autorepeat"] == 116
+    assert r.holds == []  # the 3.48 s hold exceeds max_hold_ms; no phantom short hold
+    assert r.rejector.rejected == {"hold_cap": 1}
@@ -0,0 +1,109 @@
+import random
+
+from kdyn.analytics import aggregate, aggregate_columns, HoldEvent, LatencyEvent
+from kdyn.recorder import Recorder
+from synthetic import SyntheticListener
+from kdyn.store import EventStore
+
+
+def test_segment_metrics_match_event_level_aggregate():
+    rng = random.Random(3)
+    store = EventStore()
+    t = 0.0
+    for seg in range(4):
+        store.begin_segment(t / 1000.0)
+        for i in range(300):
+            t += rng.uniform(80, 400) if i % 40 else 1500.0
+            store.add_press(65 + i % 5, t)
+            store.add_hold(65 + i % 5, rng.uniform(70, 140))
+            if i:
+                store.add_latency(rng.uniform(50, 300))
+        store.end_segment(t / 1000.0)
+        t += 60_000.0
+        store.add_press(99, t)  # outside any segment: stored but not aggregated
+
+    assert [s.press_start for s in store.segments] == [0, 301, 602, 903]
+    assert store.segments[1].press_end - store.segments[1].press_start == 300
+
+    # Exact metrics over segments 1..2 from their column offsets
+    a, b = store.segments[1], store.segments[2]
+    holds = [HoldEvent(code=c, hold_ms=v) for c, v in zip(list(store.hold_vk)[a.hold_start:b.hold_end],
+                                                          list(store.hold_ms)[a.hold_start:b.hold_end])]
+    lats = [LatencyEvent(latency_ms=v) for v in list(store.latency_ms)[a.latency_start:b.latency_end]]
+    presses = list(store.press_ts_ms)
+    exact = aggregate("s", "t", 0, 600, holds, lats, presses[a.press_start:a.press_end])
+    exact_b = aggregate("s", "t", 0, 0, [], [], presses[b.press_start:b.press_end])
+
+    fast = store.segment_metrics("s", "t", first=1, last=3)
+    assert fast.events == 600 and fast.holds_count == 600 and fast.latency_count == len(lats)
+    assert fast.bursts == exact.bursts + exact_b.bursts
+    assert abs(fast.median_hold_ms - exact.median_hold_ms) / exact.median_hold_ms < 0.05
+    assert abs(fast.p95_latency_ms - exact.p95_latency_ms) / exact.p95_latency_ms < 0.05
+    assert {k["code"]: k["count"] for k in fast.per_key} == {k["code"]: k["count"] for k in exact.per_key}
+
+    rows = store.segment_breakdown()
+    assert [r["events"] for r in rows] == [300] * 4
+
+
+def test_latency_does_not_span_pause():
+    class K:
+        def __init__(self, vk):
+            self.vk = vk
+
+    r = Recorder(idle_timeout_sec=0, listener_factory=SyntheticListener)
+    r.start("t")
+    r._on_press(K(65)); r._on_release(K(65))
+    r._on_press(K(66)); r._on_release(K(66))
+    r.pause()
+    r.resume()
+    r._on_press(K(67)); r._on_release(K(67))
+    r.stop()
+
+    assert len(r.latencies) == 1  # only B after A; none across the pause
+    assert [s.press_start for s in r.store.segments] == [0, 2]
+    assert all(not s.open for s in r.store.segments)
+
+
+def test_segment_bursts_follow_the_effective_threshold():
+    rng = random.Random(4)
+    store = EventStore()
+    t = 0.0
+    for seg in range(3):
+        store.begin_segment(t / 1000.0)
+        for i in range(200):
+            t += rng.uniform(60, 200) if i % 15 else rng.uniform(400, 600)
+            store.add_press(65, t)
+        store.end_segment(t / 1000.0)
+        t += 30_000.0
+
+    m = aggregate("s", "t", 0, 600, [], [], list(store.press_ts_ms), burst_mode="adaptive")
+    assert m.burst_threshold_ms != store.burst_threshold_ms
+    rows = store.segment_breakdown(burst_threshold_ms=m.burst_threshold_ms)
+    assert all(r["burst_threshold_ms"] == m.burst_threshold_ms for r in rows)
+    assert sum(r["bursts"] for r in rows) == m.bursts  # pauses between segments are always breaks
+    assert [r["bursts"] for r in store.segment_breakdown()] == [s.bursts for s in store.segments]
+
+
+def test_live_metrics_track_the_full_pass_without_reading_events():
+    rng = random.Random(5)
+    store = EventStore()
+    store.begin_segment(0.0)
+    t = 0.0
+    for i in range(2000):
+        t += rng.uniform(90, 250) if i % 25 else rng.uniform(1200, 2500)
+        store.add_press(65 + i % 5, t)
+        store.add_hold(65 + i % 5, rng.uniform(70, 140))
+        store.add_latency(rng.uniform(50, 300))
+    store.end_segment(t / 1000.0)
+
+    for mode in ("fixed", "adaptive"):
+        exact = aggregate_columns("s", "t", 0, 2000, store.series_chunks(), burst_mode=mode, burst_threshold_ms=700.0)
+        live = store.live_metrics("s", "t", burst_mode=mode, burst_threshold_ms=700.0)
+        assert live.events == 2000 and live.holds_count == exact.holds_count
+        assert abs(live.burst_threshold_ms - exact.burst_threshold_ms) / exact.burst_threshold_ms < 0.1
+        assert abs(live.bursts - exact.bursts) <= 2
+        assert abs(live.median_hold_ms - exact.median_hold_ms) / exact.median_hold_ms < 0.05
+        assert live.robust["hold"]["count"] == 2000
+
+    store.clear()
+    assert store.live_metrics("s", "t").bursts == 0
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import tracemalloc
+from array import array
+
+from kdyn import analytics, store as store_module
+from kdyn.analytics import aggregate, aggregate_columns
+from kdyn.extractors import ExtractorEngine
+from kdyn.store import SPILL_PREFIX, Column, EventStore, remove_stale_spill_dirs
+
+
+def traced_bytes(module) -> int:
+    """Live bytes allocated from `module`'s code; allocations by other threads or tests don't count."""
+    snap = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, module.__file__)])
+    return sum(t.size for t in snap.traces)
+
+
+def test_store_stays_within_memory_budget_and_streams_spilled_events(tmp_path):
+    budget = 256 * 1024
+    n = 200_000  # ~4 MB of raw columns, far over budget
+    peak = 0
+    tracemalloc.start()
+    try:
+        store = EventStore(memory_budget_bytes=budget, spill_dir=tmp_path)
+        for i in range(n):
+            store.add_press(65 + i % 26, float(i))
+            store.add_hold(65 + i % 26, 100.0 + i % 7)
+            store.add_latency(50.0 + i % 5)
+            if i % 5000 == 0:
+                peak = max(peak, traced_bytes(store_module))
+        peak = max(peak, traced_bytes(store_module))
+    finally:
+        tracemalloc.stop()
+
+    assert store.spilled
+    assert store.nbytes <= budget
+    assert peak < 2 * budget  # array over-allocation + bookkeeping slack
+
+    # Running aggregates stay exact regardless of spilling
+    assert store.press_ts_ms.stats.count == n
+    assert store.press_ts_ms.stats.total == sum(range(n))
+    assert store.hold_ms.stats.max == 106.0
+
+    # Streaming readback covers spilled + in-memory values in order, without gaps
+    assert list(store.press_ts_ms) == [float(i) for i in range(n)]
+    holds = list(store.iter_holds())
+    assert len(holds) == n and holds[27].code == 65 + 27 % 26 and holds[27].hold_ms == 106.0
+
+    m = aggregate("s", "2025-01-01T00:00:00Z", 1, n, store.iter_holds(), store.iter_latencies(),
+                  iter(store.press_ts_ms))
+    assert m.holds_count == n and m.latency_count == n
+    assert m.median_latency_ms == 52.0
+
+    store.clear()
+    assert len(store.hold_ms) == 0 and not list(tmp_path.iterdir())
+
+
+def test_analytics_memory_is_bounded_by_the_path_taken(tmp_path, monkeypatch):
+    budget = 64 * 1024
+    n = 50_000
+    store = EventStore(memory_budget_bytes=budget, spill_dir=tmp_path)
+    store.begin_segment(0.0)
+    t = 0.0
+    for i in range(n):
+        t += 2000.0 if i % 20 == 0 else 100.0 + (i * 37) % 150
+        store.add_press(65 + i % 26, t)
+        store.add_hold(65 + i % 26, 100.0 + i % 7)
+        store.add_latency(50.0 + i % 5)
+    store.end_segment(1.0)
+    assert store.spilled
+
+    # The exact pass (export path) streams spilled chunks into compact array state
+    engine = ExtractorEngine([analytics.HoldStatsExtractor(), analytics.LatencyStatsExtractor(),
+                              analytics.BurstExtractor("adaptive")])
+    tracemalloc.start()
+    try:
+        states = engine.run_states(store.series_chunks())
+        state_bytes = traced_bytes(analytics)
+    finally:
+        tracemalloc.stop()
+    assert 16 * n < state_bytes < 32 * n  # three float columns' worth, not Python objects per event
+    full = aggregate_columns("s", "t", 1, n, store.series_chunks(), burst_mode="adaptive")
+    assert engine.finalize(states)["bursts"]["bursts"] == full.bursts
+
+    # Live KPIs (the GUI timer path) come from bounded aggregates and never read events back
+    def no_reads(*args):
+        raise AssertionError("live metrics read the columns")
+    monkeypatch.setattr(Column, "read", no_reads)
+    live = store.live_metrics("s", "t", burst_mode="adaptive")
+
+    assert live.events == full.events == n and live.holds_count == full.holds_count == n
+    assert full.median_latency_ms == 52.0 and abs(live.median_latency_ms - 52.0) < 52.0 * 0.05
+    assert abs(live.bursts - full.bursts) <= 2
+
+
+def test_spilled_reads_survive_a_concurrent_clear(tmp_path):
+    store = EventStore(memory_budget_bytes=4096, spill_dir=tmp_path)
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                for chunk in store.press_ts_ms.iter_chunks(chunk=512):
+                    assert all(0.0 <= v < 5000.0 for v in chunk)
+        except Exception as e:
+            errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(50):
+            for i in range(5000):
+                store.add_press(65, float(i))
+            store.clear()
+    finally:
+        done.set()
+        reader.join()
+    assert errors == []
+
+
+def test_iterators_stop_at_clear_instead_of_reading_the_next_session():
+    store = EventStore(memory_budget_bytes=0)
+    for i in range(10):
+        store.add_press(65, float(i))
+    chunks = store.press_ts_ms.iter_chunks(chunk=4)
+    holds = store.series_chunks(chunk=4)["press"]
+    assert list(next(chunks)) == [0.0, 1.0, 2.0, 3.0]
+    store.clear()
+    for i in range(10):
+        store.add_press(66, 100.0 + i)
+    assert list(chunks) == [] and list(holds) == []
+
+
+def test_spilled_key_codes_are_masked_and_stale_dirs_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    store = EventStore(memory_budget_bytes=4096)
+    vks = [65 + i % 26 for i in range(2000)]
+    for i, vk in enumerate(vks):
+        store.add_press(vk, float(i))
+    assert list(store.press_vk) == vks
+    raw = array("i", (store._own_spill_dir / "press_vk.seg").read_bytes())
+    assert len(raw) == store.press_vk.spilled and list(raw) != vks[:len(raw)]
+
+    stale = tmp_path / (SPILL_PREFIX + "crashed")
+    stale.mkdir()
+    (stale / "press_vk.seg").write_bytes(b"\0" * 64)
+    os.utime(stale, (0, 0))
+    os.utime(store._own_spill_dir, (0, 0))
+    assert remove_stale_spill_dirs() == 1
+    assert not stale.exists() and list(store.press_vk) == vks
+    store.clear()
+    assert list(tmp_path.iterdir()) == []